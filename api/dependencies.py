@@ -1,22 +1,41 @@
 from typing import Optional
+from fastapi import HTTPException, Request
 from yt_dlp import YoutubeDL
 import os
-from logger import logger
+from core.concurrency import BlockingRunner
+from core.config import settings
+from core import metrics
+from core.loop_monitor import EventLoopLagMonitor
+from core.profiling import token_matches
+from core.singleflight import SingleFlight
+from core.http import HTTPClient
+from logger import get_logger, queue_handler
+from services.firebase_service import FirebaseService
+from services.nutrition_service_v2 import NutritionServiceV2
+from services.recipe_cache import RecipeCache
+from services.recipe_service import RecipeService
+from services.transcript_service import TranscriptService
+from services.job_store import JobStore
+from services.video_jobs import VideoJobManager
+from services.video_pipeline import VideoPipeline
+from services.video_service import VideoService
 
-def get_yt_dlp_client() -> YoutubeDL:
+logger = get_logger(__name__)
+
+def create_yt_dlp_client() -> YoutubeDL:
     """
     Creates and returns a configured YoutubeDL client with cookie file
     """
     try:
         cookie_file = os.getenv('YOUTUBE_COOKIES_FILE')
         if cookie_file and os.path.exists(cookie_file):
-            logger.info(f"Using cookie file: {cookie_file}")
+            logger.info("Using cookie file: %s", cookie_file)
         else:
             logger.warning("Cookie file not found or not specified")
             cookie_file = None
 
         ydl_opts = {
-            'quiet': False,  # Enable output for debugging
+            'quiet': True,
             'no_warnings': False,  # Show warnings
             'extract_flat': True,
             'cookiefile': cookie_file,
@@ -33,10 +52,125 @@ def get_yt_dlp_client() -> YoutubeDL:
             'sleep_interval_requests': 1,
             'ignoreerrors': False,  # Don't ignore errors for debugging
             'no_color': True,
-            'verbose': True,  # Add verbose output
+            'verbose': False,
         }
-            
+
         return YoutubeDL(ydl_opts)
     except Exception as e:
-        logger.error(f"Error setting up YoutubeDL client: {str(e)}")
+        logger.error("Error setting up YoutubeDL client: %s", e)
         raise
+
+class ServiceContainer:
+    """
+    App-scoped singletons, built once in the FastAPI lifespan hook and shared by every request
+    """
+    def __init__(self):
+        self.http_client = HTTPClient()
+        self.blocking = BlockingRunner()
+        self.loop_monitor = EventLoopLagMonitor()
+        self.yt_dlp_client = create_yt_dlp_client()
+        # Builds the YouTube discovery client once instead of per request
+        self.video_service = VideoService(yt_dlp_client=self.yt_dlp_client)
+        self.transcript_service = TranscriptService(executor=self.blocking.executor)
+        self.recipe_service = RecipeService()
+        self.nutrition_service = NutritionServiceV2(http_client=self.http_client)
+        self.firebase_service = FirebaseService()
+        self.recipe_cache = RecipeCache()
+        FirebaseService.add_store_listener(self.recipe_cache.invalidate)
+        self.video_pipeline = VideoPipeline(
+            video_service=self.video_service,
+            transcript_service=self.transcript_service,
+            recipe_service=self.recipe_service,
+            firebase_service=self.firebase_service,
+            blocking=self.blocking,
+            single_flight=SingleFlight(lock_dir=settings.SINGLE_FLIGHT_LOCK_DIR or None),
+            recipe_cache=self.recipe_cache,
+        )
+        self.video_jobs = VideoJobManager(self.video_pipeline, JobStore(settings.VIDEO_JOB_DB_PATH))
+        metrics.registry.add_collector(self.collect_metrics)
+
+    def collect_metrics(self):
+        """Copy cache, single-flight and loop lag stats into the metrics registry before a scrape"""
+        recipes = self.recipe_cache.stats()
+        metrics.CACHE_LOOKUPS.set_total(recipes['hits'], cache='recipes', result='hit')
+        metrics.CACHE_LOOKUPS.set_total(recipes['misses'], cache='recipes', result='miss')
+
+        # Memory misses fall through to disk, so only those that miss there too are real misses
+        fdc = self.nutrition_service.cache.stats()
+        for name in ('search', 'food'):
+            metrics.CACHE_LOOKUPS.set_total(fdc[name]['hits'], cache=f'fdc_{name}', result='hit')
+            metrics.CACHE_LOOKUPS.set_total(fdc[name]['disk_hits'], cache=f'fdc_{name}', result='disk_hit')
+            metrics.CACHE_LOOKUPS.set_total(fdc[name]['misses'] - fdc[name]['disk_hits'], cache=f'fdc_{name}', result='miss')
+
+        llm = self.recipe_service.llm_cache.stats()
+        metrics.CACHE_LOOKUPS.set_total(llm['hits'], cache='llm', result='hit')
+        metrics.CACHE_LOOKUPS.set_total(llm['disk_hits'], cache='llm', result='disk_hit')
+        metrics.CACHE_LOOKUPS.set_total(llm['misses'] - llm['disk_hits'], cache='llm', result='miss')
+
+        single_flight = self.video_pipeline.single_flight.stats()
+        metrics.SINGLE_FLIGHT_CALLS.set_total(single_flight['leaders'], role='leader')
+        metrics.SINGLE_FLIGHT_CALLS.set_total(single_flight['coalesced'], role='coalesced')
+
+        metrics.LOG_RECORDS_DROPPED.set_total(queue_handler.dropped)
+
+        loop_lag = self.loop_monitor.stats()
+        for stat in ('mean', 'p50', 'p99', 'max'):
+            metrics.EVENT_LOOP_LAG_SECONDS.set(loop_lag[f'{stat}_ms'] / 1000, stat=stat)
+
+    async def startup(self):
+        if settings.NLTK_DOWNLOAD_ON_STARTUP:
+            await self.blocking.run(TranscriptService.download_nltk_data)
+        await self.http_client.start()
+        await self.video_jobs.start()
+        await self.loop_monitor.start()
+        logger.info("Service container started")
+
+    async def shutdown(self):
+        await self.loop_monitor.stop()
+        await self.video_jobs.stop()
+        FirebaseService.remove_store_listener(self.recipe_cache.invalidate)
+        self.video_jobs.store.close()
+        await self.http_client.close()
+        self.blocking.shutdown(wait=False)
+        logger.info("Service container stopped")
+
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+def get_http_client(request: Request) -> HTTPClient:
+    """
+    Returns the application-wide pooled HTTP client created in the lifespan hook
+    """
+    return get_services(request).http_client
+
+def get_yt_dlp_client(request: Request) -> YoutubeDL:
+    return get_services(request).yt_dlp_client
+
+def get_video_service(request: Request) -> VideoService:
+    return get_services(request).video_service
+
+def get_transcript_service(request: Request) -> TranscriptService:
+    return get_services(request).transcript_service
+
+def get_recipe_service(request: Request) -> RecipeService:
+    return get_services(request).recipe_service
+
+def get_nutrition_service(request: Request) -> NutritionServiceV2:
+    return get_services(request).nutrition_service
+
+def get_firebase_service(request: Request) -> FirebaseService:
+    return get_services(request).firebase_service
+
+def get_blocking_runner(request: Request) -> BlockingRunner:
+    return get_services(request).blocking
+
+def get_video_pipeline(request: Request) -> VideoPipeline:
+    return get_services(request).video_pipeline
+
+def get_video_jobs(request: Request) -> VideoJobManager:
+    return get_services(request).video_jobs
+
+def require_debug_token(request: Request):
+    """Guards the /debug/ routes: 404 unless PROFILE_TOKEN is set and sent as X-Debug-Token"""
+    if not token_matches(request.headers.get('x-debug-token', '')):
+        raise HTTPException(status_code=404, detail="Not Found")
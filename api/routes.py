@@ -5,31 +5,46 @@ import os
 from datetime import datetime
 import random
 import tempfile
-from typing import List
+from typing import Iterator, List, Literal, Optional
 
 import boto3
 import dotenv
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, ValidationError
-from pyinstrument import Profiler
 import requests
 from yt_dlp import YoutubeDL
 import aiohttp
 
-from api.dependencies import get_yt_dlp_client
-from logger import logger
-from models.schemas import (ContentCategory, NutritionIngredient,
+from api.dependencies import (ServiceContainer, get_blocking_runner,
+                              get_firebase_service,
+                              get_nutrition_service, get_services,
+                              get_recipe_service, get_video_jobs,
+                              get_video_pipeline, require_debug_token)
+from logger import get_logger
+from core.concurrency import BlockingRunner
+from core.config import settings
+from core.metrics import registry as metrics_registry
+from core.profiling import get_profile_store
+from models.schemas import (BatchNutritionRequest, BatchNutritionResponse,
+                            ContentCategory, NutritionIngredient,
                             NutritionLabel, NutritionRequest,
-                            NutritionResponse, VideoContent, VideoRequest,
-                            VideoResponse)
+                            NutritionResponse, JobStatus, VideoContent,
+                            VideoJobResponse, VideoRequest, VideoResponse)
 from recipe_classifier import Recipe, RecipeClassification
-from services.firebase_service import FirebaseService
+from services.firebase_service import (COOKBOOK_SUMMARY_FIELDS,
+                                       RECIPE_SUMMARY_FIELDS, FirebaseService)
 from services.nutrition_service import NutritionService
 from services.nutrition_service_v2 import NutritionServiceV2
 from services.recipe_service import RecipeService
 from services.transcript_service import TranscriptService
+from services.video_jobs import VideoJobManager
+from services.video_pipeline import VideoPipeline
 from services.video_service import VideoService
 
+logger = get_logger(__name__)
+
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -59,166 +74,254 @@ class URLRequest(BaseModel):
 async def hello():
     return {"message": "testing enpoint"}
 
-def get_recipe_service() -> RecipeService:
-    return RecipeService()
+@router.get("/debug/loop-lag/", dependencies=[Depends(require_debug_token)], include_in_schema=False)
+async def loop_lag(services: ServiceContainer = Depends(get_services)):
+    """
+    Event loop lag since the last reset; anything well above zero means something blocked the loop
+    """
+    return services.loop_monitor.stats()
+
+@router.post("/debug/loop-lag/reset/", dependencies=[Depends(require_debug_token)], include_in_schema=False)
+async def reset_loop_lag(services: ServiceContainer = Depends(get_services)):
+    services.loop_monitor.reset()
+    return {"message": "Loop lag samples reset"}
+
+@router.get("/debug/profiles/", dependencies=[Depends(require_debug_token)], include_in_schema=False)
+async def list_profiles():
+    """
+    Stored request profiles, newest first; fetch one from /debug/profiles/{name}
+    """
+    return {"profiles": get_profile_store().list()}
+
+@router.get("/debug/profiles/{name}", dependencies=[Depends(require_debug_token)], include_in_schema=False)
+async def get_profile(name: str):
+    path = get_profile_store().path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path)
+
+@router.get("/cache/stats/")
+async def cache_stats(services: ServiceContainer = Depends(get_services)):
+    """
+    Hit rates and sizes of the in-process caches
+    """
+    return {
+        "recipes": services.recipe_cache.stats(),
+        "video_single_flight": services.video_pipeline.single_flight.stats(),
+        "fdc": services.nutrition_service.cache.stats(),
+        "llm": services.recipe_service.llm_cache.stats(),
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage latency histograms, cache, token and error counters in the Prometheus text format
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @router.post("/videos/")
 async def process_video(
     video: VideoRequest,
-    yt_dlp_client: YoutubeDL = Depends(get_yt_dlp_client),
-    transcript_service: TranscriptService = Depends(),
-    recipe_service: RecipeService = Depends(get_recipe_service),
-    nutrition_service: NutritionServiceV2 = Depends(),
+    video_pipeline: VideoPipeline = Depends(get_video_pipeline),
 ):
-    logger.info(f"Processing video URL: {video.url}")
+    logger.info("Processing video URL: %s", video.url)
     
     try:
-        # Initialize VideoService with the yt-dlp client
-        video_service = VideoService(yt_dlp_client=yt_dlp_client)
-        
-        logger.info(f"Starting to process video URL: {video.url}")
-        video_id = video_service.extract_video_id(video.url)
-        if not video_id:
-            logger.error(f"Failed to extract video ID from URL: {video.url}")
-            raise HTTPException(status_code=400, detail="Invalid YouTube video URL")
-
-        # Check if video exists in Firebase
-        logger.info(f"Checking if video {video_id} exists in Firebase")
-        cached_data = FirebaseService.get_recipe(video_id)
-        if cached_data:
-            try:
-                logger.info(f"Video {video_id} already processed, returning cached data.")
-                response = VideoResponse(**cached_data)
-                print(f"\n=== CACHED VIDEO RESPONSE ===")
-                if response.nutrition:
-                    print(f"Nutrition data present:")
-                    print(f"Total calories: {response.nutrition.total.calories}")
-                    print(f"Total protein: {response.nutrition.total.protein.amount}g")
-                else:
-                    print("No nutrition data in cached response")
-                return response
-            except ValidationError as ve:
-                logger.error(f"Validation error with cached data: {ve}")
-                # Proceed to process the video
-
-        # Process the video as it's not cached
-        logger.info(f"Video {video_id} not found in cache, processing...")
-
-        title, description, duration = video_service.get_video_info(video_id)
-        logger.info(f"Fetched video info: Title='{title}', Duration={duration}")
-
-        transcript = await transcript_service.get_transcript(video_id)
-        if not transcript:
-            logger.warning(f"No transcript found for video {video_id}.")
-            raise HTTPException(status_code=404, detail="Transcript not found for the video.")
-
-        video_content = VideoContent(
-            title=title,
-            description=description,
-            transcript=transcript
-        )
-        
-        logger.info(f"Video content: {video_content}")
-
-        # Classify the video content
-        classification: RecipeClassification = recipe_service.classify_video_content(video_content)
-        
-        logger.info(f"[DEBUG]: {classification}")
-        
-        
-        video_data = {
-            "video_id": video_id,
-            "title": "",
-            "description": description,
-            "transcript": transcript,
-            "is_recipe_video": classification["is_recipe"] == ContentCategory.recipe,
-            "created_at": datetime.utcnow().isoformat()
-        }
-
-        if classification["is_recipe"] == ContentCategory.recipe:
-            
-            recipe_details: Recipe = classification["recipe_details"]
-            
-            processed_data = video_service.process_recipe_for_llm(title, description, transcript)
-
-            video_data.update({
-                "processed_data": json.dumps({
-                    "classification": classification["recipe_details"],
-                    "llm_prompt": processed_data.get('prompt', '')
-                }),
-                "recipe": classification["recipe_details"],
-                "nutrition": None  # Don't calculate nutrition facts initially
-            })
-        else:
-            video_data.update({
-                "processed_data": json.dumps({
-                    "classification": classification.model_dump_json()
-                }),
-                "recipe": None,
-                "nutrition": None
-            })
-
-        # Store the processed data in Firebase
-        FirebaseService.store_recipe(video_id, video_data)
-
-        return video_data
+        # Every blocking stage runs off the event loop (see VideoPipeline)
+        return await video_pipeline.process(video.url)
 
     except Exception as e:
         error_message = str(e)
         if "Sign in to confirm you're not a bot" in error_message:
-            logger.error(f"YouTube bot detection triggered: {error_message}")
+            logger.error("YouTube bot detection triggered: %s", error_message)
             raise HTTPException(
                 status_code=429,
                 detail="YouTube has detected automated access. Please try again later or provide authentication cookies."
             )
-        logger.error(f"Error processing video: {error_message}", exc_info=True)
+        logger.error("Error processing video: %s", error_message, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred while processing the video."
         )
         
+@router.post("/videos/stream/")
+async def stream_video(
+    video: VideoRequest,
+    video_pipeline: VideoPipeline = Depends(get_video_pipeline),
+):
+    """
+    Same pipeline as /videos/, streamed as NDJSON with one event per completed stage
+    """
+    video_id = video_pipeline.video_service.extract_video_id(video.url)
+    if not video_id:
+        logger.error("Failed to extract video ID from URL: %s", video.url)
+        raise HTTPException(status_code=400, detail="Invalid YouTube video URL")
+
+    async def events():
+        try:
+            async for event in video_pipeline.process_stream(video_id):
+                yield json.dumps(jsonable_encoder(event)) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "data": {"status_code": e.status_code, "detail": e.detail}}) + "\n"
+        except Exception as e:
+            if "Sign in to confirm you're not a bot" in str(e):
+                logger.error("YouTube bot detection triggered: %s", e)
+                yield json.dumps({"event": "error", "data": {"status_code": 429, "detail": "YouTube has detected automated access. Please try again later or provide authentication cookies."}}) + "\n"
+                return
+            logger.error("Error streaming video %s: %s", video_id, e, exc_info=True)
+            yield json.dumps({"event": "error", "data": {"status_code": 500, "detail": "An unexpected error occurred while processing the video."}}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/videos/jobs/", response_model=VideoJobResponse, status_code=202)
+async def submit_video_job(
+    video: VideoRequest,
+    video_jobs: VideoJobManager = Depends(get_video_jobs),
+):
+    """
+    Queue a video for background processing and return its job id right away
+    """
+    job = await video_jobs.submit(video.url)
+    logger.info("Queued video job %s for %s", job['job_id'], video.url)
+    return job
+
+@router.get("/videos/jobs/{job_id}", response_model=VideoJobResponse)
+async def get_video_job(
+    job_id: str,
+    video_jobs: VideoJobManager = Depends(get_video_jobs),
+):
+    job = await video_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.get("/videos/jobs/{job_id}/events")
+async def stream_video_job(
+    job_id: str,
+    video_jobs: VideoJobManager = Depends(get_video_jobs),
+):
+    """
+    Server-Sent Events stream of job updates, closed once the job succeeds or fails
+    """
+    if await video_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def events():
+        last_update = None
+        while True:
+            job = await video_jobs.get(job_id)
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                payload = VideoJobResponse(**job).model_dump_json()
+                yield f"event: {job['status']}\ndata: {payload}\n\n"
+                if job["status"] in (JobStatus.succeeded, JobStatus.failed):
+                    return
+            else:
+                # Keep proxies from closing an idle stream
+                yield ": keepalive\n\n"
+            await video_jobs.wait_for_change(job_id, since=last_update, timeout=15)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.post("/nutrition/", response_model=NutritionResponse)
 async def get_nutrition_facts(
     request: NutritionRequest,
-    nutrition_service: NutritionServiceV2 = Depends()
+    nutrition_service: NutritionServiceV2 = Depends(get_nutrition_service)
 ):
     try:
-        logger.info(f"Calculating nutrition facts for {len(request.ingredients)} ingredients")
-        logger.info(f"Request: {request}")
-        nutrition_response =  nutrition_service.calculate_nutrition(request.ingredients)
-        logger.info(f"Nutrition Respinse: {nutrition_response}")
-        
-        # Log the response before returning
-        logger.info("\nPer ingredient breakdown:")
+        logger.info("Calculating nutrition facts for %s ingredients", len(request.ingredients))
+        logger.debug("Request: %s", request)
+        nutrition_response = await nutrition_service.calculate_nutrition(request.ingredients)
+        logger.debug("Nutrition response: %s", nutrition_response)
         
         return nutrition_response
     except Exception as e:
-        logger.error(f"Error calculating nutrition facts: {str(e)}", exc_info=True)
+        logger.error("Error calculating nutrition facts: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while calculating nutrition facts"
         )
         
+@router.post("/nutrition/batch/", response_model=BatchNutritionResponse)
+async def get_batch_nutrition_facts(
+    request: BatchNutritionRequest,
+    nutrition_service: NutritionServiceV2 = Depends(get_nutrition_service)
+):
+    """
+    Calculate nutrition facts for many recipes, resolving each distinct ingredient once
+    """
+    if len(request.recipes) > settings.NUTRITION_BATCH_MAX_RECIPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.NUTRITION_BATCH_MAX_RECIPES} recipes can be calculated per request"
+        )
+
+    try:
+        logger.info("Calculating nutrition facts for a batch of %s recipes", len(request.recipes))
+        results = await nutrition_service.calculate_nutrition_batch(
+            [recipe.ingredients for recipe in request.recipes]
+        )
+        return BatchNutritionResponse(results=results)
+    except Exception as e:
+        logger.error("Error calculating batch nutrition facts: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while calculating nutrition facts"
+        )
+        
+def _list_fields(view: str, fields: Optional[str], summary_fields: List[str]) -> Optional[List[str]]:
+    """select() projection for list endpoints: explicit `fields`, the summary set, or None for full documents"""
+    if fields:
+        return [field.strip() for field in fields.split(",") if field.strip()]
+    if view == "summary":
+        return summary_fields
+    return None
+
+def _ndjson(documents: Iterator[dict]) -> Iterator[str]:
+    for document in documents:
+        yield json.dumps(jsonable_encoder(document)) + "\n"
+
 @router.get("/recipes/{user_id}")
 async def get_user_recipes(
     user_id: str,
-    firebase_service: FirebaseService = Depends()
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.USER_LIST_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    stream: bool = False,
+    firebase_service: FirebaseService = Depends(get_firebase_service),
+    blocking: BlockingRunner = Depends(get_blocking_runner),
 ):
     """
-    Get all recipes for a specific user
+    Get a user's recipes, newest first. Without `limit` every recipe is returned, as before paging.
+
+    With `limit`, pass the X-Next-Cursor response header back as `cursor` for the next page; it is
+    absent on the last page. `view=summary` or `fields=a,b` limits the returned fields. `stream=true` returns every
+    recipe as NDJSON instead of a page.
     """
+    projection = _list_fields(view, fields, RECIPE_SUMMARY_FIELDS)
+    if stream:
+        return StreamingResponse(
+            _ndjson(firebase_service.stream_user_recipes(user_id, projection)),
+            media_type="application/x-ndjson"
+        )
+
     try:
-        # Get all recipes for the user from Firebase
-        recipes = firebase_service.get_user_recipes(user_id)
-        logger.info(f"Retrieved {len(recipes)} recipes from Firebase")
-        
-        if not recipes:
-            return []
+        # Get one page of recipes for the user from Firebase
+        recipes, next_cursor = await blocking.run(
+            firebase_service.get_user_recipes_page, user_id, limit, cursor, projection
+        )
+        logger.info("Retrieved %s recipes from Firebase", len(recipes))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         return recipes
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching recipes for user {user_id}: {str(e)}", exc_info=True)
+        logger.error("Error fetching recipes for user %s: %s", user_id, e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while fetching recipes for user {user_id}"
@@ -227,23 +330,40 @@ async def get_user_recipes(
 @router.get("/cookbooks/{user_id}")
 async def get_user_cookbooks(
     user_id: str,
-    firebase_service: FirebaseService = Depends()
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.USER_LIST_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    stream: bool = False,
+    firebase_service: FirebaseService = Depends(get_firebase_service),
+    blocking: BlockingRunner = Depends(get_blocking_runner),
 ):
     """
-    Get all cookbooks for a specific user
+    Get a user's cookbooks, all of them or one page at a time (same paging, projection and streaming options as /recipes/{user_id})
     """
+    projection = _list_fields(view, fields, COOKBOOK_SUMMARY_FIELDS)
+    if stream:
+        return StreamingResponse(
+            _ndjson(firebase_service.stream_user_cookbooks(user_id, projection)),
+            media_type="application/x-ndjson"
+        )
+
     try:
-        # Get all cookbooks for the user from Firebase
-        cookbooks = firebase_service.get_user_cookbooks(user_id)
-        logger.info(f"Retrieved {len(cookbooks)} recipes from Firebase")
-        
-        if not cookbooks:
-            return []
+        # Get one page of cookbooks for the user from Firebase
+        cookbooks, next_cursor = await blocking.run(
+            firebase_service.get_user_cookbooks_page, user_id, limit, cursor, projection
+        )
+        logger.info("Retrieved %s cookbooks from Firebase", len(cookbooks))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         return cookbooks
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching cookbooks for user {user_id}: {str(e)}", exc_info=True)
+        logger.error("Error fetching cookbooks for user %s: %s", user_id, e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while fetching cookbooks for user {user_id}"
@@ -253,7 +373,7 @@ async def get_user_cookbooks(
 async def delete_user_recipe(
     user_id: str,
     video_id: str,
-    firebase_service: FirebaseService = Depends()
+    firebase_service: FirebaseService = Depends(get_firebase_service)
 ):
     """
     Delete a recipe for a specific user
@@ -261,12 +381,12 @@ async def delete_user_recipe(
     try:
         # Delete the recipe from Firebase
       
-        logger.info(f"Deleted recipe {video_id} for user {user_id}")
+        logger.info("Deleted recipe %s for user %s", video_id, user_id)
         firebase_service.delete_recipe(user_id, video_id)
         return {"message": "Recipe deleted successfully"}
         
     except Exception as e:
-        logger.error(f"Error deleting recipe {video_id} for user {user_id}: {str(e)}", exc_info=True)
+        logger.error("Error deleting recipe %s for user %s: %s", video_id, user_id, e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while deleting recipe {video_id} for user {user_id}"
@@ -288,7 +408,7 @@ async def process_instagram_recipe(request_body: URLRequest,  recipe_service: Re
             ) as response:
                 if response.status != 200:
                     error_text = await response.text()
-                    logger.error(f"Error from local service: {error_text}")
+                    logger.error("Error from local service: %s", error_text)
                     raise HTTPException(
                         status_code=response.status,
                         detail="Error processing Instagram URL"
@@ -305,7 +425,7 @@ async def process_instagram_recipe(request_body: URLRequest,  recipe_service: Re
                 
                 video_content = VideoContent(description=caption, transcript=transcript)
                 
-                classification: RecipeClassification = recipe_service.classify_video_content(video_content)
+                classification: RecipeClassification = await recipe_service.classify_video_content_async(video_content)
                 
                 return classification
                 
@@ -313,13 +433,13 @@ async def process_instagram_recipe(request_body: URLRequest,  recipe_service: Re
                 
                 
     except aiohttp.ClientError as e:
-        logger.error(f"Error connecting to local service: {str(e)}")
+        logger.error("Error connecting to local service: %s", e)
         raise HTTPException(
             status_code=503,
             detail="Could not connect to local service"
         )
     except Exception as e:
-        logger.error(f"Unexpected error processing Instagram URL: {str(e)}")
+        logger.error("Unexpected error processing Instagram URL: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred"
@@ -0,0 +1,250 @@
+"""
+Load test and latency benchmark for the API's hot paths.
+
+Run the API against local stand-ins so no quota or LLM spend is used:
+
+    uvicorn simulators.app:app --port 8100
+    gcloud emulators firestore start --host-port=127.0.0.1:8200
+    FIRESTORE_EMULATOR_HOST=127.0.0.1:8200 FDC_BASE_URL=http://127.0.0.1:8100/fdc/v1 \\
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8100 TRANSCRIPT_API_URL=http://127.0.0.1:8100 \\
+    GEMINI_BASE_URL=http://127.0.0.1:8100 uvicorn main:app --port 8000
+
+    python -m benchmarks.run --concurrency 1 8 32 --requests 200 --out benchmarks/results/latest.json
+
+Each scenario reports p50/p95/p99/max latency, requests per second, errors by status and
+the API's event loop lag during the run (from GET /debug/loop-lag/). The /debug/ routes need
+the API's PROFILE_TOKEN, passed as --debug-token or read from the PROFILE_TOKEN environment
+variable. With --baseline, the run fails if any scenario's p95 regressed by more than
+--max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+INGREDIENTS = [
+    ("chicken breast", 300, "g"), ("white rice", 1, "cup"), ("garlic", 3, "clove"), ("olive oil", 2, "tbsp"),
+    ("onion", 1, "whole"), ("tomatoes", 400, "g"), ("all-purpose flour", 2, "cup"), ("sugar", 100, "g"),
+    ("butter", 4, "tbsp"), ("eggs", 2, "large"), ("whole milk", 250, "ml"), ("salt", 1, "tsp"),
+    ("black pepper", 0.5, "tsp"), ("lemon juice", 2, "tbsp"),
+]
+
+HIT_VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def nutrition_body() -> Dict[str, Any]:
+    ingredients = random.sample(INGREDIENTS, k=random.randint(3, 8))
+    return {"ingredients": [{"name": name, "amount": amount, "unit": unit} for name, amount, unit in ingredients]}
+
+
+def cold_video_body() -> Dict[str, Any]:
+    # The simulators answer any id, so every request is a cache miss that runs the whole pipeline
+    return {"url": f"https://www.youtube.com/watch?v=bench{uuid.uuid4().hex[:11]}"}
+
+
+# name -> (method, path, body factory)
+def scenarios(user_id: str) -> Dict[str, Tuple[str, str, Optional[Callable[[], Dict[str, Any]]]]]:
+    return {
+        "videos_hit": ("POST", "/videos/", lambda: {"url": HIT_VIDEO_URL}),
+        "videos_cold": ("POST", "/videos/", cold_video_body),
+        "nutrition": ("POST", "/nutrition/", nutrition_body),
+        "recipes": ("GET", f"/recipes/{user_id}", None),
+        "cookbooks": ("GET", f"/cookbooks/{user_id}", None),
+    }
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def fetch_json(
+    session: aiohttp.ClientSession,
+    method: str,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+) -> Optional[Dict[str, Any]]:
+    try:
+        async with session.request(method, url, headers=headers) as response:
+            if response.status == 200:
+                return await response.json()
+            print(f"Warning: {method} {url} returned {response.status}; loop lag is missing from the results", file=sys.stderr)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Warning: {method} {url} failed ({e!r}); loop lag is missing from the results", file=sys.stderr)
+    return None
+
+
+async def run_scenario(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    name: str,
+    spec: Tuple[str, str, Optional[Callable[[], Dict[str, Any]]]],
+    concurrency: int,
+    total_requests: int,
+    debug_token: str,
+) -> Dict[str, Any]:
+    method, path, body_factory = spec
+    url = f"{base_url}{path}"
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            body = body_factory() if body_factory else None
+            started = time.perf_counter()
+            try:
+                async with session.request(method, url, json=body) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    debug_headers = {"X-Debug-Token": debug_token}
+    await fetch_json(session, "POST", f"{base_url}/debug/loop-lag/reset/", debug_headers)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    loop_lag = await fetch_json(session, "GET", f"{base_url}/debug/loop-lag/", debug_headers)
+
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            "p50": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99": round(percentile(ordered, 0.99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+        "loop_lag_ms": loop_lag,
+    }
+
+
+def print_table(results: List[Dict[str, Any]]):
+    header = f"{'scenario':<12} {'conc':>5} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'lag p99':>9} {'lag max':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        latency = result["latency_ms"]
+        lag = result["loop_lag_ms"] or {}
+        print(
+            f"{result['scenario']:<12} {result['concurrency']:>5} {result['requests']:>6} {result['errors']:>5} "
+            f"{result['rps']:>8.1f} {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} "
+            f"{lag.get('p99_ms', 0.0):>9.1f} {lag.get('max_ms', 0.0):>9.1f}"
+        )
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if not before or not before["latency_ms"]["p95"]:
+            continue
+        change = result["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1
+        if change > max_regression:
+            regressions.append(
+                f"{result['scenario']} @ {result['concurrency']}: p95 {before['latency_ms']['p95']:.1f} -> "
+                f"{result['latency_ms']['p95']:.1f} ms (+{change:.0%})"
+            )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    available = scenarios(args.user_id)
+    unknown = set(args.scenarios) - set(available)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    if not args.debug_token:
+        print("Event loop lag needs the API's PROFILE_TOKEN: pass --debug-token or set PROFILE_TOKEN", file=sys.stderr)
+        return 2
+
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=max(args.concurrency) * 2)
+    results = []
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        if "videos_hit" in args.scenarios:
+            # Prime the cache so videos_hit measures the cached path only
+            async with session.post(f"{args.base_url}/videos/", json={"url": HIT_VIDEO_URL}) as response:
+                await response.read()
+
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_scenario(session, args.base_url, name, available[name], concurrency, args.requests, args.debug_token)
+                results.append(result)
+                print(f"{name} @ {concurrency}: {result['rps']} rps, p95 {result['latency_ms']['p95']} ms, {result['errors']} errors")
+
+    print()
+    print_table(results)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "requests_per_scenario": args.requests,
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+    missing_lag = [f"{r['scenario']} @ {r['concurrency']}" for r in results if r["loop_lag_ms"] is None]
+    if missing_lag:
+        print(f"\nEvent loop lag could not be read for: {', '.join(missing_lag)}", file=sys.stderr)
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\np95 regressions over the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo p95 regressions over {args.max_regression:.0%} against {args.baseline}")
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the API's hot paths")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--scenarios", nargs="+", default=["videos_hit", "videos_cold", "nutrition", "recipes", "cookbooks"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--user-id", default="bench_user", help="User for the /recipes/ and /cookbooks/ scenarios")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--debug-token", default=os.environ.get("PROFILE_TOKEN", ""),
+                        help="The API's PROFILE_TOKEN, sent as X-Debug-Token to read event loop lag")
+    parser.add_argument("--out", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--baseline", help="Previous results JSON to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 increase over the baseline (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Sentinel returned on a cache miss so that falsy values (0, [], {}) can still be cached
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None, expires_at: Optional[float] = None):
+        if expires_at is None:
+            ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+            expires_at = time.time() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """Persistent namespaced key/value store backed by a single SQLite file.
+
+    Values are stored as JSON. Rows past their expiry are ignored on read and
+    the least recently accessed rows are pruned once `max_entries` is exceeded.
+    Access times are buffered and written in batches, so a hit is a single SELECT.
+    """
+
+    PRUNE_EVERY = 100  # writes between size checks
+    # Access times are written once this many keys are buffered, or this long after the last write
+    ACCESS_FLUSH_EVERY = 100
+    ACCESS_FLUSH_SECONDS = 60.0
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._pending_access: Dict[Tuple[str, str], float] = {}
+        self._access_flushed_at = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (namespace, accessed_at)')
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return MISSING
+
+            self._record_access(namespace, key, now)
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_with_expiry(self, namespace: str, key: str) -> Tuple[Any, Optional[float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                return MISSING, None
+            self._record_access(namespace, key, now)
+        return json.loads(row[0]), row[1]
+
+    def _record_access(self, namespace: str, key: str, now: float):
+        """Buffer an access time; call with the lock held"""
+        self._pending_access[(namespace, key)] = now
+        if len(self._pending_access) >= self.ACCESS_FLUSH_EVERY or now - self._access_flushed_at >= self.ACCESS_FLUSH_SECONDS:
+            self._flush_access()
+            self._conn.commit()
+
+    def _flush_access(self):
+        """Write buffered access times (without committing); call with the lock held"""
+        self._access_flushed_at = time.time()
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            'UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?',
+            [(accessed_at, namespace, key) for (namespace, key), accessed_at in self._pending_access.items()]
+        )
+        self._pending_access.clear()
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._pending_access.pop((namespace, key), None)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), expires_at, now)
+            )
+            self._conn.commit()
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= self.PRUNE_EVERY:
+                self._prune()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+            self._conn.commit()
+
+    def load_recent(self, namespace: str, limit: int) -> List[Tuple[str, Any, Optional[float]]]:
+        """Return the most recently used live entries of a namespace, newest first"""
+        with self._lock:
+            self._flush_access()
+            rows = self._conn.execute(
+                """
+                SELECT key, value, expires_at FROM cache
+                WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)
+                ORDER BY accessed_at DESC LIMIT ?
+                """,
+                (namespace, time.time(), limit)
+            ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def _prune(self):
+        """Drop expired rows, then the least recently accessed rows beyond max_entries"""
+        self._writes_since_prune = 0
+        self._flush_access()
+        self._conn.execute('DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),))
+        (count,) = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY accessed_at ASC LIMIT ?)',
+                (count - self.max_entries,)
+            )
+        self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+
+class TieredCache:
+    """In-process LRU in front of a shared SQLiteCache namespace.
+
+    Memory misses fall through to disk and are promoted on hit. On creation the
+    most recently used disk entries are loaded so a restart starts warm. Async code
+    should use get_async/set_async, which keep the SQLite calls off the event loop.
+    """
+
+    def __init__(
+        self,
+        disk: Optional[SQLiteCache],
+        namespace: str,
+        ttl_seconds: Optional[float] = None,
+        memory_entries: int = 1024,
+        warm_start: bool = True,
+    ):
+        self.disk = disk
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.memory = TTLCache(max_entries=memory_entries, ttl_seconds=ttl_seconds)
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+        if disk is not None and warm_start:
+            # Oldest first so the newest entries end up most recently used
+            for key, value, expires_at in reversed(disk.load_recent(namespace, memory_entries)):
+                self.memory.set(key, value, expires_at=expires_at)
+
+    def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING or self.disk is None:
+            return value
+        return self._promote(key, *self.disk.get_with_expiry(self.namespace, key))
+
+    async def get_async(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING or self.disk is None:
+            return value
+        return self._promote(key, *await asyncio.to_thread(self.disk.get_with_expiry, self.namespace, key))
+
+    def _promote(self, key: str, value: Any, expires_at: Optional[float]) -> Any:
+        if value is MISSING:
+            self.disk_misses += 1
+            return MISSING
+
+        self.disk_hits += 1
+        self.memory.set(key, value, expires_at=expires_at)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        self.memory.set(key, value, ttl_seconds=ttl)
+        if self.disk is not None:
+            self.disk.set(self.namespace, key, value, ttl_seconds=ttl)
+
+    async def set_async(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        self.memory.set(key, value, ttl_seconds=ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, self.namespace, key, value, ttl)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(self.namespace, key)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats.update({
+            'disk_hits': self.disk_hits,
+            'disk_misses': self.disk_misses,
+        })
+        lookups = stats['hits'] + stats['misses']
+        # A lookup is only a true miss if it also missed on disk
+        stats['hit_rate'] = round((stats['hits'] + self.disk_hits) / lookups, 4) if lookups else 0.0
+        return stats
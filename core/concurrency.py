@@ -0,0 +1,26 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from core.config import settings
+
+
+class BlockingRunner:
+    """Runs blocking SDK calls (Firestore, googleapiclient, LLM clients) on a bounded thread pool.
+
+    The event loop awaits the result instead of executing the call itself, so a
+    slow call only occupies one worker thread and the loop can keep serving
+    other requests.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, thread_name_prefix: str = 'blocking'):
+        self.max_workers = max_workers or settings.BLOCKING_MAX_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=thread_name_prefix)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -21,6 +21,93 @@ class Settings(BaseSettings):
         'writedescription': False,
     }
     
+    # FDC lookup cache (in-process LRU + SQLite on disk). Set FDC_CACHE_PATH to "" for memory only.
+    FDC_CACHE_PATH: str = ".cache/fdc_cache.sqlite3"
+    FDC_SEARCH_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    FDC_FOOD_CACHE_TTL_SECONDS: int = 180 * 24 * 3600
+    FDC_CACHE_MEMORY_ENTRIES: int = 4096
+    FDC_CACHE_DISK_ENTRIES: int = 100000
+    
+    # "remote" uses the FDC API, "local" uses the dataset built by ingest_fdc.py
+    FDC_BACKEND: str = "remote"
+    FDC_LOCAL_DB_PATH: str = "data/fdc_local.sqlite3"
+    
+    NUTRITION_BATCH_MAX_RECIPES: int = 100
+    
+    # Shared outbound HTTP client (connection pool, timeouts, retry/backoff)
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_BACKOFF_BASE_SECONDS: float = 0.5
+    HTTP_BACKOFF_MAX_SECONDS: float = 8.0
+    
+    # Thread pool for blocking SDK calls (Firestore, YouTube Data API, transcripts)
+    BLOCKING_MAX_WORKERS: int = 32
+    
+    # Directory for per-video lock files so workers on one host coalesce /videos/ work. "" = in-process only.
+    SINGLE_FLIGHT_LOCK_DIR: str = ""
+    
+    # In-process cache of validated /videos/ responses in front of Firestore
+    RECIPE_CACHE_MAX_ENTRIES: int = 2048
+    RECIPE_CACHE_TTL_SECONDS: int = 3600
+    RECIPE_CACHE_NEGATIVE_TTL_SECONDS: int = 60
+    
+    # Transcripts longer than this (approximate tokens) are condensed before classification
+    TRANSCRIPT_CONDENSE_MAX_TOKENS: int = 2000
+    # Fetch missing NLTK data on startup. Images can bake it in instead with
+    # `python -m nltk.downloader punkt punkt_tab stopwords` and turn this off.
+    NLTK_DOWNLOAD_ON_STARTUP: bool = True
+    
+    # Content token budget for LLM models not listed in services/prompt_builder.py
+    PROMPT_DEFAULT_CONTENT_TOKENS: int = 4000
+    # Budget of the llm_prompt copy stored in processed_data (about the 5k characters it always held)
+    STORED_PROMPT_MAX_TOKENS: int = 1250
+    
+    # Content-addressed cache of parsed LLM classifications. Set LLM_CACHE_PATH to "" for memory only.
+    LLM_CACHE_PATH: str = ".cache/llm_cache.sqlite3"
+    LLM_CACHE_TTL_SECONDS: int = 90 * 24 * 3600
+    LLM_CACHE_MEMORY_ENTRIES: int = 1024
+    LLM_CACHE_DISK_ENTRIES: int = 20000
+    
+    # Upstream endpoints. Point these at simulators/app.py for load tests; empty means the real service.
+    FDC_BASE_URL: str = "https://api.nal.usda.gov/fdc/v1"
+    YOUTUBE_API_ENDPOINT: str = ""
+    TRANSCRIPT_API_URL: str = ""
+    GEMINI_BASE_URL: str = ""
+    BEDROCK_BASE_URL: str = ""
+    
+    # Largest `limit` accepted by /recipes/{user_id} and /cookbooks/{user_id} (no limit = unpaginated)
+    USER_LIST_MAX_PAGE_SIZE: int = 500
+    
+    # Background /videos/ jobs (POST /videos/jobs/)
+    VIDEO_JOB_DB_PATH: str = ".cache/video_jobs.sqlite3"
+    VIDEO_JOB_WORKERS: int = 4
+    # Workers renew leases on their jobs; a job whose lease lapses is adopted by another worker
+    VIDEO_JOB_LEASE_SECONDS: float = 60.0
+
+    # Per-request profiling (core/profiling.py): X-Profile header or ?profile=, plus a random sample
+    PROFILE_SAMPLE_RATE: float = 0.0
+    # The header/query value must match it, and /debug/ routes need it as X-Debug-Token.
+    # While empty, profiling is sample-only and the /debug/ routes return 404.
+    PROFILE_TOKEN: str = ""
+    PROFILE_INTERVAL_SECONDS: float = 0.001
+    PROFILE_DIR: str = ".cache/profiles"
+    PROFILE_MAX_REPORTS: int = 200
+
+    # Logging (logger.py). LOG_LEVELS overrides per module, e.g. "services.transcript_service=DEBUG,httpx=WARNING"
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_STDOUT_FORMAT: str = "text"  # text or json
+    # JSON lines; "" = stdout only. One file per process: use "{pid}" (e.g. "logs/app.{pid}.log") when
+    # running several workers; it is inserted before the extension when WEB_CONCURRENCY > 1.
+    LOG_FILE: str = "app.log"
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUPS: int = 5
+    LOG_MAX_MESSAGE_CHARS: int = 4000
+    LOG_QUEUE_MAX_SIZE: int = 10000
+
     
     
 settings = Settings()
\ No newline at end of file
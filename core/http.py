@@ -0,0 +1,125 @@
+import asyncio
+import random
+from typing import Any, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.config import settings
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """Application-lifetime aiohttp session shared by every outbound API call.
+
+    Connections are pooled and kept alive, so repeat calls to the same host skip
+    the TCP and TLS handshake. Total and per-host connection counts are capped.
+    Requests that hit a retryable status or a connection error are retried with
+    exponential backoff and full jitter, and Retry-After is honoured.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        connect_timeout_seconds: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base_seconds: Optional[float] = None,
+        backoff_max_seconds: Optional[float] = None,
+    ):
+        self.limit = limit or settings.HTTP_POOL_LIMIT
+        self.limit_per_host = limit_per_host or settings.HTTP_POOL_LIMIT_PER_HOST
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout_seconds or settings.HTTP_TIMEOUT_SECONDS,
+            connect=connect_timeout_seconds or settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        )
+        self.max_retries = max_retries if max_retries is not None else settings.HTTP_MAX_RETRIES
+        self.backoff_base_seconds = backoff_base_seconds or settings.HTTP_BACKOFF_BASE_SECONDS
+        self.backoff_max_seconds = backoff_max_seconds or settings.HTTP_BACKOFF_MAX_SECONDS
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTPClient has not been started")
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max_seconds)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+
+    async def request_json(self, method: str, url: str, **kwargs) -> Any:
+        """Send a request and return the decoded JSON body, retrying transient failures"""
+        await self.start()
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status in RETRYABLE_STATUSES and attempt < self.max_retries:
+                        delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                        logger.warning("%s %s returned %s, retrying in %.2fs", method, url, response.status, delay)
+                    else:
+                        response.raise_for_status()
+                        return await response.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("%s %s failed (%s), retrying in %.2fs", method, url, type(e).__name__, delay)
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def create_sync_session() -> requests.Session:
+    """Pooled requests.Session with the same limits and retry policy, for synchronous callers"""
+    session = requests.Session()
+    retry = Retry(
+        total=settings.HTTP_MAX_RETRIES,
+        backoff_factor=settings.HTTP_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.HTTP_BACKOFF_MAX_SECONDS,
+        status_forcelist=sorted(RETRYABLE_STATUSES),
+        allowed_methods=['GET', 'POST'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=settings.HTTP_POOL_LIMIT_PER_HOST, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_sync_session: Optional[requests.Session] = None
+
+
+def get_sync_session() -> requests.Session:
+    """Process-wide pooled requests.Session, created on first use"""
+    global _sync_session
+    if _sync_session is None:
+        _sync_session = create_sync_session()
+    return _sync_session
@@ -0,0 +1,61 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps for `interval`.
+
+    Any lag is time the loop spent running something else without yielding,
+    so it surfaces blocking calls made on the loop. The last `window` samples
+    are kept for percentiles; the max is tracked since the last reset.
+    """
+
+    def __init__(self, interval: float = 0.05, window: int = 2000):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.total_samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            self.total_samples += 1
+            self.max_lag = max(self.max_lag, lag)
+
+    def reset(self):
+        self.samples.clear()
+        self.max_lag = 0.0
+        self.total_samples = 0
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        return {
+            'interval_ms': self.interval * 1000,
+            'samples': self.total_samples,
+            'mean_ms': (sum(ordered) / len(ordered) * 1000) if ordered else 0.0,
+            'p50_ms': percentile(0.50),
+            'p99_ms': percentile(0.99),
+            'max_ms': self.max_lag * 1000,
+        }
@@ -0,0 +1,210 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans a cache hit (~1ms) to a slow LLM call (~30s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: str):
+        """Mirror a count that is already kept elsewhere (e.g. TTLCache.hits) at scrape time"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    """Point-in-time value per label set"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: str):
+        self.set_total(value, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a trailing +Inf bucket, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus collectors that refresh mirrored values right before each scrape"""
+
+    def __init__(self, prefix: str = 'recipify'):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        name = f"{self.prefix}_{name}"
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (version 0.0.4)"""
+        for collector in list(self._collectors):
+            collector()
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+PIPELINE_STAGE_SECONDS = registry.histogram(
+    'pipeline_stage_seconds', 'Duration of each /videos/ pipeline stage', ['stage', 'outcome'])
+FDC_REQUEST_SECONDS = registry.histogram(
+    'fdc_request_seconds', 'Duration of FoodData Central API calls', ['endpoint', 'outcome'])
+FIRESTORE_OPERATION_SECONDS = registry.histogram(
+    'firestore_operation_seconds', 'Duration of Firestore operations', ['operation', 'outcome'])
+LLM_TOKENS = registry.counter(
+    'llm_tokens_total', 'Tokens reported by the LLM providers', ['model', 'kind'])
+ERRORS = registry.counter(
+    'errors_total', 'Exceptions raised inside instrumented operations', ['component', 'error_type'])
+# Mirrored from the caches' and monitors' own stats() at scrape time
+CACHE_LOOKUPS = registry.counter(
+    'cache_lookups_total', 'In-process cache lookups by result', ['cache', 'result'])
+SINGLE_FLIGHT_CALLS = registry.counter(
+    'single_flight_calls_total', 'Video pipeline calls that ran (leader) or joined one in flight (coalesced)', ['role'])
+LOG_RECORDS_DROPPED = registry.counter(
+    'log_records_dropped_total', 'Log records dropped because the logging queue was full')
+EVENT_LOOP_LAG_SECONDS = registry.gauge(
+    'event_loop_lag_seconds', 'Event loop lag since the last reset of /debug/loop-lag/', ['stat'])
+
+
+@contextmanager
+def track(histogram: Histogram, component: str, **labels: str) -> Iterator[None]:
+    """
+    Time the block into `histogram` with an outcome label of ok, error or cancelled,
+    counting errors by exception type under `component`
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = 'cancelled'
+        raise
+    except Exception as e:
+        outcome = 'error'
+        ERRORS.inc(component=component, error_type=type(e).__name__)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started, outcome=outcome, **labels)
+
+
+def record_llm_usage(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind='prompt')
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, model=model, kind='completion')
@@ -0,0 +1,188 @@
+import asyncio
+import glob
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+
+from core.config import settings
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# format -> (renderer, file suffix). Speedscope files open at https://www.speedscope.app
+RENDERERS = {
+    'html': (HTMLRenderer, '.html'),
+    'speedscope': (SpeedscopeRenderer, '.speedscope.json'),
+}
+META_SUFFIX = '.meta.json'
+NAME_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+class ProfileStore:
+    """Profiling reports in a local directory, each with a JSON sidecar; only the newest `max_reports` are kept"""
+
+    def __init__(self, directory: Optional[str] = None, max_reports: Optional[int] = None):
+        self.directory = directory or settings.PROFILE_DIR
+        self.max_reports = max_reports or settings.PROFILE_MAX_REPORTS
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_name(method: str, path: str, fmt: str) -> str:
+        slug = re.sub(r'\W+', '_', path).strip('_')[:60] or 'root'
+        return f"{time.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:6]}_{method.lower()}_{slug}{RENDERERS[fmt][1]}"
+
+    def save(self, name: str, profiler: Profiler, fmt: str, meta: Dict[str, Any]):
+        renderer, _ = RENDERERS[fmt]
+        report = profiler.output(renderer=renderer())
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, name)
+            with open(path, 'w') as f:
+                f.write(report)
+            with open(path + META_SUFFIX, 'w') as f:
+                json.dump({**meta, 'name': name, 'format': fmt, 'bytes': len(report)}, f)
+            self._prune()
+
+    def _prune(self):
+        meta_paths = sorted(glob.glob(os.path.join(self.directory, f'*{META_SUFFIX}')), key=os.path.getmtime)
+        for meta_path in meta_paths[:max(0, len(meta_paths) - self.max_reports)]:
+            for path in (meta_path[:-len(META_SUFFIX)], meta_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Sidecar metadata of every stored report, newest first"""
+        reports = []
+        for meta_path in glob.glob(os.path.join(self.directory, f'*{META_SUFFIX}')):
+            try:
+                with open(meta_path) as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(reports, key=lambda report: report.get('created_at', ''), reverse=True)
+
+    def path(self, name: str) -> Optional[str]:
+        """Filesystem path of a stored report, or None for unknown (or unsafe) names"""
+        if not NAME_PATTERN.match(name) or name.endswith(META_SUFFIX):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+def token_matches(supplied: str, token: Optional[str] = None) -> bool:
+    """
+    True when `supplied` equals the configured PROFILE_TOKEN. With no token configured nothing
+    matches, so on-demand profiling and the /debug/ routes stay off by default.
+    """
+    token = settings.PROFILE_TOKEN if token is None else token
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Process-wide ProfileStore, created on first use"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore()
+    return _profile_store
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs pyinstrument over a request when asked to with an X-Profile header
+    or ?profile= query value matching PROFILE_TOKEN, or when PROFILE_SAMPLE_RATE picks it, and
+    stores the report. Requests are ignored while no token is configured.
+
+    The report name is returned in the X-Profile-Report header and listed at /debug/profiles/.
+    X-Profile-Format or ?profile_format= selects html (default) or speedscope. Async mode
+    attributes time spent awaiting to the awaiting request, so the report covers the
+    whole request, including the streamed body, and not just its CPU time.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[ProfileStore] = None,
+        sample_rate: Optional[float] = None,
+        token: Optional[str] = None,
+        interval: Optional[float] = None,
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.token = settings.PROFILE_TOKEN if token is None else token
+        self.interval = interval or settings.PROFILE_INTERVAL_SECONDS
+
+    def _trigger(self, scope) -> Optional[str]:
+        """'requested' or 'sampled' when this request should be profiled, otherwise None"""
+        headers = dict(scope.get('headers') or [])
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        requested = headers.get(b'x-profile', b'').decode('latin-1') or query.get('profile', [''])[0]
+        if requested and token_matches(requested, self.token):
+            return 'requested'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    @staticmethod
+    def _format(scope) -> str:
+        headers = dict(scope.get('headers') or [])
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        fmt = headers.get(b'x-profile-format', b'').decode('latin-1') or query.get('profile_format', [''])[0]
+        return fmt if fmt in RENDERERS else 'html'
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope['type'] == 'http' else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        store = self.store or get_profile_store()
+        fmt = self._format(scope)
+        name = store.new_name(scope['method'], scope['path'], fmt)
+        status = None
+
+        async def send_with_report(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message = {**message, 'headers': [*message.get('headers', []), (b'x-profile-report', name.encode())]}
+            await send(message)
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+        profiler = Profiler(interval=self.interval, async_mode='enabled')
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            profiler.stop()
+            meta = {
+                'created_at': created_at,
+                'method': scope['method'],
+                'path': scope['path'],
+                'status': status,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                'trigger': trigger,
+            }
+            try:
+                # Rendering takes tens of milliseconds; keep it off the event loop
+                await asyncio.to_thread(store.save, name, profiler, fmt, meta)
+                logger.info("Stored profile %s (%s ms, %s)", name, meta['duration_ms'], trigger)
+            except Exception as e:
+                logger.error("Failed to store profile %s: %s", name, e)
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-worker locking is unavailable
+    fcntl = None
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key starts the work as a task; callers that arrive
+    while it is running await the same task and receive its result (or its
+    exception). The task is shielded, so a disconnecting caller never cancels
+    work that other callers are waiting on.
+
+    With `lock_dir` set, the work also holds an exclusive file lock per key, so
+    uvicorn workers on the same host run it one at a time. The work function
+    should re-check its cache first, since a worker waiting on the lock
+    usually finds the result already stored.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if lock_dir and fcntl is None:
+            logger.warning("fcntl is unavailable, single-flight is limited to this process")
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.create_task(self._run(key, func))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            logger.info("Joining in-flight work for %s", key)
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.lock_dir:
+            return await func()
+
+        lock_path = os.path.join(self.lock_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.lock')
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            try:
+                return await func()
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': len(self._inflight),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+        }
@@ -0,0 +1,32 @@
+import argparse
+
+from core.config import settings
+from services.fdc_local_store import FDCDatasetLoader, LocalFoodStore
+from services.nutrition_service_v2 import FDC_NUTRIENT_MAP
+
+
+def ingest_fdc_datasets(paths, output_path):
+    """
+    Builds the local FDC store used by NutritionServiceV2 when FDC_BACKEND=local.
+
+    Each path is either an unzipped CSV download directory (containing food.csv and
+    food_nutrient.csv) or a JSON download file, for Foundation, SR Legacy or FNDDS.
+    Only the nutrients in FDC_NUTRIENT_MAP are kept.
+    """
+    store = LocalFoodStore(output_path, FDC_NUTRIENT_MAP)
+    loader = FDCDatasetLoader(store)
+
+    for path in paths:
+        loader.load(path)
+
+    print(f"Local FDC store at {output_path} now holds {store.count()} foods")
+    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest FDC bulk downloads into the local nutrient store")
+    parser.add_argument("paths", nargs="+", help="CSV download directories or JSON download files")
+    parser.add_argument("--out", default=settings.FDC_LOCAL_DB_PATH, help="Path of the SQLite store to write")
+    args = parser.parse_args()
+
+    ingest_fdc_datasets(args.paths, args.out)
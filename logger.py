@@ -1,21 +1,134 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Tuple
 
-# get logger 
+from core.config import settings
 
-logger = logging.getLogger()
+# Attributes every LogRecord has; anything else came in through `extra=` and is added to the JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    limit = limit or settings.LOG_MAX_MESSAGE_CHARS
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, exception and any `extra=` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = truncate(self.formatException(record.exc_info))
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class TruncatingQueueHandler(QueueHandler):
+    """
+    Puts records on the queue for the listener thread, which does the formatting and I/O.
+
+    The message is merged with its args here so later changes to a mutable arg cannot alter
+    it, and cut to LOG_MAX_MESSAGE_CHARS. When the queue is full the record is dropped and
+    counted instead of blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
-formatter = logging.Formatter(
-    fmt='%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
-stream_handler = logging.StreamHandler(sys.stdout)
-file_handler = logging.FileHandler('app.log')
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'module=LEVEL,other.module=LEVEL' -> {module: level}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
 
-stream_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
 
-logger.handlers = [stream_handler, file_handler] 
+def log_file_path() -> str:
+    """
+    LOG_FILE for this process. RotatingFileHandler is not safe across processes: workers sharing
+    one file clobber each other's rollovers. `{pid}` in LOG_FILE gives each worker its own file,
+    and is added automatically when WEB_CONCURRENCY (uvicorn/gunicorn --workers) is above 1.
+    """
+    path = settings.LOG_FILE
+    if '{pid}' not in path and int(os.environ.get('WEB_CONCURRENCY') or 1) > 1:
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{{pid}}{ext}"
+    return path.format(pid=os.getpid())
 
-logger.setLevel(logging.INFO)
\ No newline at end of file
+
+def configure_logging() -> Tuple[QueueListener, TruncatingQueueHandler]:
+    text_formatter = logging.Formatter(
+        fmt='%(asctime)s.%(msecs)03d - %(levelname)s - %(name)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if settings.LOG_STDOUT_FORMAT == 'json' else text_formatter)
+    handlers = [stream_handler]
+
+    if settings.LOG_FILE:
+        file_handler = RotatingFileHandler(
+            log_file_path(),
+            maxBytes=settings.LOG_FILE_MAX_BYTES,
+            backupCount=settings.LOG_FILE_BACKUPS,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    queue_handler = TruncatingQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    # Flush what is still queued on interpreter exit
+    atexit.register(listener.stop)
+    return listener, queue_handler
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Module logger, so LOG_LEVELS can tune it; importing this module sets up the handlers"""
+    return logging.getLogger(name)
+
+
+listener, queue_handler = configure_logging()
+logger = logging.getLogger()
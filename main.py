@@ -1,10 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from api.routes import router
 from core.config import settings
+from core.profiling import ProfilingMiddleware
+from api.dependencies import ServiceContainer
 import logging
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Services are built once here and shared by every request
+    app.state.services = ServiceContainer()
+    await app.state.services.startup()
+    yield
+    await app.state.services.shutdown()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,12 +23,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Report"],  # Page cursor for /recipes/{user_id} and /cookbooks/{user_id}, profile report name
 )
+# Added last so it wraps CORS too; a no-op unless a request asks to be profiled or is sampled
+app.add_middleware(ProfilingMiddleware)
 app.include_router(router, prefix=settings.API_V1_STR)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logging.error(f"Unhandled exception: {exc}")
+    logging.error("Unhandled exception: %s", exc)
     return {
         "error": True,
         "message": "An unexpected error occurred. Please try again later.",
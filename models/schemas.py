@@ -273,6 +273,12 @@ class NutritionResponse(BaseModel):
     total: Optional[NutritionLabel] = None
     ingredient_details: Optional[List[Dict[str, Any]]] = []  # Store detailed ingredient matching info
 
+class BatchNutritionRequest(BaseModel):
+    recipes: List[NutritionRequest]
+
+class BatchNutritionResponse(BaseModel):
+    results: List[NutritionResponse] = []  # One response per request recipe, in the same order
+
 class VideoResponse(BaseModel):
     video_id: str
     title: str
@@ -284,6 +290,22 @@ class VideoResponse(BaseModel):
     nutrition: Optional[NutritionResponse] = None
     created_at: datetime
     
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    
+class VideoJobResponse(BaseModel):
+    job_id: str
+    url: str
+    status: JobStatus
+    stage: Optional[str] = None  # Pipeline stage while running (cache_lookup, fetching, classifying, storing)
+    result: Optional[Dict[str, Any]] = None  # The /videos/ response body once succeeded
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
 class ContentCategory(str, Enum):
     recipe = "recipe"
     not_a_recipe = "not_a_recipe"
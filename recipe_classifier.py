@@ -2,17 +2,23 @@ from anthropic import AnthropicBedrock
 import os
 import json
 import dotenv
-from fastapi import logger
 import instructor
 from pydantic import BaseModel, Field 
 from enum import Enum
-from typing import List, Optional 
+from typing import AsyncIterator, List, Optional 
 from google import genai
 import re
 
+from core.config import settings
+from core.metrics import record_llm_usage
+from logger import get_logger
+from services.prompt_builder import count_tokens, fit_video_content
+
 dotenv.load_dotenv()
 
-anthropic_bedrock_client = AnthropicBedrock() 
+logger = get_logger(__name__)
+
+anthropic_bedrock_client = AnthropicBedrock(base_url=settings.BEDROCK_BASE_URL or None) 
 client = instructor.from_anthropic(anthropic_bedrock_client) 
 
 class ContentCategory(str, Enum):
@@ -73,13 +79,16 @@ class RecipeClassification(BaseModel):
     suggested_tags: List[str] 
     recipe_details: Recipe
     
+CLAUDE_CLASSIFICATION_MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
+
 def classify_video_content(video_content: VideoContent) -> RecipeClassification:
     """Classify video content using Claude"""
     
-    # Truncate content to fit within token limits
-    title = video_content.title[:200]
-    description = video_content.description
-    transcript = video_content.transcript
+    # Trim content to the model's token budget
+    content = fit_video_content(video_content.title, video_content.description, video_content.transcript, CLAUDE_CLASSIFICATION_MODEL)
+    title = content['title']
+    description = content['description']
+    transcript = content['transcript']
     
     analysis_prompt = f"""
     Analyze this cooking video content and extract recipe details:
@@ -110,8 +119,9 @@ def classify_video_content(video_content: VideoContent) -> RecipeClassification:
     """
 
     try:
+        logger.debug("Classifying with %s: ~%s prompt tokens %s", CLAUDE_CLASSIFICATION_MODEL, count_tokens(analysis_prompt), content['tokens'])
         response = client.messages.create(
-            model="anthropic.claude-3-haiku-20240307-v1:0",
+            model=CLAUDE_CLASSIFICATION_MODEL,
             max_tokens=4096,
             temperature=0.7,
             response_model=RecipeClassification,
@@ -123,9 +133,10 @@ def classify_video_content(video_content: VideoContent) -> RecipeClassification:
                 {"role": "user", "content": analysis_prompt}
             ]
         )
+        record_claude_usage(CLAUDE_CLASSIFICATION_MODEL, response)
         return response
     except Exception as e:
-        print(f"Error during video classification: {str(e)}")
+        logger.exception("Error during video classification: %s", e)
         raise
     
 def parse_ingredient(ingredient_str, known_units=None, qualitative_amounts=None):
@@ -249,13 +260,43 @@ def parse_ingredient(ingredient_str, known_units=None, qualitative_amounts=None)
     return result
     
     
-def classify_recipe_video_gemini(video_content: VideoContent) -> RecipeClassification:
-    title = video_content.title[:100]
-    description = video_content.description
-    transcript = video_content.transcript
-    
+_gemini_client: Optional[genai.Client] = None
+
+
+def get_gemini_client() -> genai.Client:
+    """Process-wide Gemini client, created on first use"""
+    global _gemini_client
+    if _gemini_client is None:
+        http_options = {'base_url': settings.GEMINI_BASE_URL} if settings.GEMINI_BASE_URL else None
+        _gemini_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options=http_options)
+    return _gemini_client
+
+
+GEMINI_CLASSIFICATION_MODEL = 'gemini-2.0-flash'
+
+
+def record_gemini_usage(response):
+    """Count the tokens Gemini reports for a response (the last chunk carries them when streaming)"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None:
+        record_llm_usage(GEMINI_CLASSIFICATION_MODEL, usage.prompt_token_count, usage.candidates_token_count)
+
+
+def record_claude_usage(model: str, response):
+    """Count the tokens of an instructor response, from the raw Anthropic message it keeps"""
+    usage = getattr(getattr(response, '_raw_response', None), 'usage', None)
+    if usage is not None:
+        record_llm_usage(model, usage.input_tokens, usage.output_tokens)
+
+
+def build_gemini_classification_prompt(video_content: VideoContent) -> str:
+    # Trim content to the model's token budget
+    content = fit_video_content(video_content.title, video_content.description, video_content.transcript, GEMINI_CLASSIFICATION_MODEL)
+    title = content['title']
+    description = content['description']
+    transcript = content['transcript']
     
-    analysis_prompt = f"""
+    return f"""
     Analyze this cooking video content and extract recipe details IF IT IS A RECIPE. If not, return empty:
 
     Title: {title}
@@ -264,27 +305,72 @@ def classify_recipe_video_gemini(video_content: VideoContent) -> RecipeClassific
     
     Be descriptive when the instructions or transcript aren't too detailed (not too wordy).  
     """
-    
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    
+
+
+GEMINI_CLASSIFICATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': RecipeClassification.model_json_schema()
+}
+
+
+def classify_recipe_video_gemini(video_content: VideoContent) -> RecipeClassification:
+    analysis_prompt = build_gemini_classification_prompt(video_content)
+    logger.debug("Classifying with %s: ~%s prompt tokens", GEMINI_CLASSIFICATION_MODEL, count_tokens(analysis_prompt))
     
     try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
+        response = get_gemini_client().models.generate_content(
+            model=GEMINI_CLASSIFICATION_MODEL,
             contents=analysis_prompt,
-            config={
-                'response_mime_type': 'application/json',
-                'response_schema': RecipeClassification.model_json_schema()
-            },
+            config=GEMINI_CLASSIFICATION_CONFIG,
         )
+        record_gemini_usage(response)
          
         # turn response.text into a json object
         data = json.loads(response.text) 
         return data
         
-       
+    except Exception as e:
+        logger.exception("Error during video classification: %s", e)
+        raise
+
+
+async def classify_recipe_video_gemini_async(video_content: VideoContent) -> RecipeClassification:
+    """Same as classify_recipe_video_gemini, but awaits Gemini's native async client instead of blocking the loop"""
+    analysis_prompt = build_gemini_classification_prompt(video_content)
+    logger.debug("Classifying with %s: ~%s prompt tokens", GEMINI_CLASSIFICATION_MODEL, count_tokens(analysis_prompt))
+    
+    try:
+        response = await get_gemini_client().aio.models.generate_content(
+            model=GEMINI_CLASSIFICATION_MODEL,
+            contents=analysis_prompt,
+            config=GEMINI_CLASSIFICATION_CONFIG,
+        )
+        record_gemini_usage(response)
+        
+        return json.loads(response.text)
         
     except Exception as e:
-        print(f"Error during video classification: {str(e)}")
+        logger.exception("Error during video classification: %s", e)
         raise
 
+
+async def stream_recipe_video_gemini(video_content: VideoContent) -> AsyncIterator[str]:
+    """Yield the raw JSON text of the classification as Gemini generates it"""
+    analysis_prompt = build_gemini_classification_prompt(video_content)
+    logger.debug("Classifying with %s: ~%s prompt tokens", GEMINI_CLASSIFICATION_MODEL, count_tokens(analysis_prompt))
+    
+    try:
+        stream = await get_gemini_client().aio.models.generate_content_stream(
+            model=GEMINI_CLASSIFICATION_MODEL,
+            contents=analysis_prompt,
+            config=GEMINI_CLASSIFICATION_CONFIG,
+        )
+        chunk = None
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+        record_gemini_usage(chunk)
+                
+    except Exception as e:
+        logger.exception("Error during video classification: %s", e)
+        raise
@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from core.http import HTTPClient
+from core.metrics import FDC_REQUEST_SECONDS, track
+
+# FDC accepts at most 20 fdcIds per POST /foods request
+FDC_BULK_MAX_IDS = 20
+
+# The `nutrients` filter of POST /foods takes nutrient numbers, not nutrient ids
+FDC_NUTRIENT_NUMBERS = {
+    1008: 208,   # Energy (kcal)
+    1004: 204,   # Total lipids (fat)
+    1258: 606,   # Fatty acids, total saturated
+    1257: 605,   # Fatty acids, total trans
+    1253: 601,   # Cholesterol
+    1093: 307,   # Sodium
+    1005: 205,   # Carbohydrate, by difference
+    1079: 291,   # Fiber, total dietary
+    2000: 269,   # Sugars, total
+    1235: 539,   # Added Sugars
+    1003: 203,   # Protein
+    1114: 328,   # Vitamin D (D2 + D3)
+    1087: 301,   # Calcium
+    1089: 303,   # Iron
+    1092: 306,   # Potassium
+}
+
+
+def chunk_ids(fdc_ids: Iterable[Any], size: int = FDC_BULK_MAX_IDS) -> List[List[str]]:
+    ids = [str(fdc_id) for fdc_id in dict.fromkeys(fdc_ids)]
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def parse_food_nutrients(food_nutrients: List[Dict[str, Any]], nutrient_map: Dict[str, int]) -> Dict[str, float]:
+    """Map an FDC foodNutrients list onto our nutrient keys.
+
+    Handles the full format (nested `nutrient.id`), the search format
+    (`nutrientId`/`value`) and the abridged format (`number`/`amount`).
+    """
+    keys_by_id = {nutrient_id: key for key, nutrient_id in nutrient_map.items()}
+    keys_by_number = {
+        str(FDC_NUTRIENT_NUMBERS[nutrient_id]): key
+        for key, nutrient_id in nutrient_map.items() if nutrient_id in FDC_NUTRIENT_NUMBERS
+    }
+
+    nutrients = {}
+    for nutrient in food_nutrients:
+        key = None
+        amount = None
+        try:
+            if 'nutrient' in nutrient:
+                key = keys_by_id.get(int(nutrient['nutrient'].get('id')))
+                amount = nutrient.get('amount')
+            elif 'nutrientId' in nutrient:
+                key = keys_by_id.get(int(nutrient['nutrientId']))
+                amount = nutrient.get('value')
+            elif 'number' in nutrient:
+                key = keys_by_number.get(str(nutrient['number']))
+                amount = nutrient.get('amount')
+        except (ValueError, TypeError):
+            continue
+
+        if key is not None and amount is not None:
+            try:
+                nutrients[key] = float(amount)
+            except (ValueError, TypeError):
+                continue
+
+    return nutrients
+
+
+class FDCBulkNutrientFetcher:
+    """Fetches nutrient profiles for many fdcIds through FDC's POST /foods.
+
+    Ids are chunked to the API limit and the response is filtered server-side
+    to the nutrients in `nutrient_map`. Returns {fdcId: {nutrient_key: amount}}.
+    Ids that FDC does not return are simply absent.
+    """
+
+    def __init__(self, api_key: Optional[str], nutrient_map: Dict[str, int], base_url: str = 'https://api.nal.usda.gov/fdc/v1'):
+        self.api_key = api_key
+        self.nutrient_map = nutrient_map
+        self.base_url = base_url
+        self.nutrient_numbers = [
+            FDC_NUTRIENT_NUMBERS[nutrient_id] for nutrient_id in nutrient_map.values() if nutrient_id in FDC_NUTRIENT_NUMBERS
+        ]
+
+    def _payload(self, chunk: List[str]) -> Dict[str, Any]:
+        return {
+            'fdcIds': [int(fdc_id) for fdc_id in chunk],
+            'format': 'abridged',
+            'nutrients': self.nutrient_numbers,
+        }
+
+    def _parse(self, foods: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+        return {
+            str(food['fdcId']): parse_food_nutrients(food.get('foodNutrients', []), self.nutrient_map)
+            for food in foods if food.get('fdcId') is not None
+        }
+
+    async def fetch(
+        self,
+        http: HTTPClient,
+        fdc_ids: Iterable[Any],
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        async def fetch_chunk(chunk: List[str]) -> Dict[str, Dict[str, float]]:
+            async with semaphore or contextlib.nullcontext():
+                with track(FDC_REQUEST_SECONDS, 'fdc', endpoint='/foods'):
+                    foods = await http.request_json(
+                        'POST',
+                        f"{self.base_url}/foods",
+                        params={'api_key': self.api_key},
+                        json=self._payload(chunk)
+                    )
+                return self._parse(foods)
+
+        results = {}
+        for chunk_result in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunk_ids(fdc_ids))):
+            results.update(chunk_result)
+        return results
+
+    def fetch_sync(self, session: requests.Session, fdc_ids: Iterable[Any], timeout: float = 10.0) -> Dict[str, Dict[str, float]]:
+        results = {}
+        for chunk in chunk_ids(fdc_ids):
+            response = session.post(
+                f"{self.base_url}/foods",
+                params={'api_key': self.api_key},
+                json=self._payload(chunk),
+                timeout=timeout
+            )
+            response.raise_for_status()
+            results.update(self._parse(response.json()))
+        return results
@@ -0,0 +1,93 @@
+import re
+from typing import Any, Dict, Optional
+
+from core.cache import MISSING, SQLiteCache, TieredCache
+from core.config import settings
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FDCCache:
+    """Two-tier cache for FDC search results (by normalized query) and nutrient profiles (by fdcId)"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        search_ttl_seconds: Optional[float] = None,
+        food_ttl_seconds: Optional[float] = None,
+        memory_entries: Optional[int] = None,
+        disk_entries: Optional[int] = None,
+    ):
+        path = path if path is not None else settings.FDC_CACHE_PATH
+        self.disk = SQLiteCache(path, max_entries=disk_entries or settings.FDC_CACHE_DISK_ENTRIES) if path else None
+
+        memory_entries = memory_entries or settings.FDC_CACHE_MEMORY_ENTRIES
+        self.searches = TieredCache(
+            self.disk,
+            namespace='fdc_search',
+            ttl_seconds=search_ttl_seconds or settings.FDC_SEARCH_CACHE_TTL_SECONDS,
+            memory_entries=memory_entries,
+        )
+        self.foods = TieredCache(
+            self.disk,
+            namespace='fdc_food',
+            ttl_seconds=food_ttl_seconds or settings.FDC_FOOD_CACHE_TTL_SECONDS,
+            memory_entries=memory_entries,
+        )
+        logger.info(
+            "FDC cache ready (%s): %s searches, %s foods warmed from disk",
+            path or 'memory only', len(self.searches.memory), len(self.foods.memory)
+        )
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        query = re.sub(r'\([^)]*\)', '', query.lower())
+        return ' '.join(query.split())
+
+    def get_search(self, query: str) -> Optional[Dict[str, Any]]:
+        value = self.searches.get(self.normalize_query(query))
+        return None if value is MISSING else value
+
+    def set_search(self, query: str, result: Dict[str, Any]):
+        self.searches.set(self.normalize_query(query), result)
+
+    def get_food(self, fdc_id: str) -> Optional[Dict[str, float]]:
+        value = self.foods.get(str(fdc_id))
+        return None if value is MISSING else value
+
+    def set_food(self, fdc_id: str, nutrients: Dict[str, float]):
+        self.foods.set(str(fdc_id), nutrients)
+
+    # Async variants for request handlers: disk lookups and writes run in a thread
+    async def get_search_async(self, query: str) -> Optional[Dict[str, Any]]:
+        value = await self.searches.get_async(self.normalize_query(query))
+        return None if value is MISSING else value
+
+    async def set_search_async(self, query: str, result: Dict[str, Any]):
+        await self.searches.set_async(self.normalize_query(query), result)
+
+    async def get_food_async(self, fdc_id: str) -> Optional[Dict[str, float]]:
+        value = await self.foods.get_async(str(fdc_id))
+        return None if value is MISSING else value
+
+    async def set_food_async(self, fdc_id: str, nutrients: Dict[str, float]):
+        await self.foods.set_async(str(fdc_id), nutrients)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'search': self.searches.stats(),
+            'food': self.foods.stats(),
+            'disk_entries': self.disk.count() if self.disk else 0,
+        }
+
+
+_fdc_cache: Optional[FDCCache] = None
+
+
+def get_fdc_cache() -> FDCCache:
+    """Process-wide FDCCache, created on first use"""
+    global _fdc_cache
+    if _fdc_cache is None:
+        _fdc_cache = FDCCache()
+    return _fdc_cache
@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bulk download data types we keep, mapped to the names the FDC API returns
+CSV_DATA_TYPES = {
+    'foundation_food': 'Foundation',
+    'sr_legacy_food': 'SR Legacy',
+    'survey_fndds_food': 'Survey (FNDDS)',
+}
+
+# Top-level keys of the bulk JSON downloads
+JSON_FOOD_KEYS = ('FoundationFoods', 'SRLegacyFoods', 'SurveyFoods')
+
+# Foundation foods often report energy and sugars under different nutrient ids
+NUTRIENT_FALLBACKS = {
+    'calories': (2047, 2048),  # Energy (Atwater General / Specific Factors)
+    'total_sugars': (1063,),   # Sugars, Total
+}
+
+
+class LocalFoodStore:
+    """Compact SQLite copy of the FDC foods we care about.
+
+    One row per food holding its description, data type and the per-100g
+    amount of each nutrient in `nutrient_map` (NULL when not reported).
+    """
+
+    def __init__(self, path: str, nutrient_map: Dict[str, int]):
+        self.path = path
+        self.nutrient_map = nutrient_map
+        self.columns = list(nutrient_map.keys())
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._create_schema()
+
+    def _create_schema(self):
+        nutrient_columns = ', '.join(f'{column} REAL' for column in self.columns)
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS foods (
+                fdc_id INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                {nutrient_columns}
+            )
+            """
+        )
+        self._conn.commit()
+
+    def upsert_foods(self, rows: Iterable[Tuple[int, str, str, Dict[str, float]]], batch_size: int = 5000) -> int:
+        """Insert or replace (fdc_id, description, data_type, nutrients) rows"""
+        placeholders = ', '.join('?' for _ in range(3 + len(self.columns)))
+        statement = f"INSERT OR REPLACE INTO foods (fdc_id, description, data_type, {', '.join(self.columns)}) VALUES ({placeholders})"
+
+        count = 0
+        batch = []
+        with self._lock:
+            for fdc_id, description, data_type, nutrients in rows:
+                batch.append((fdc_id, description, data_type, *(nutrients.get(column) for column in self.columns)))
+                if len(batch) >= batch_size:
+                    self._conn.executemany(statement, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._conn.executemany(statement, batch)
+                count += len(batch)
+            self._conn.commit()
+        return count
+
+    def get_nutrients(self, fdc_id: str) -> Dict[str, float]:
+        try:
+            fdc_id = int(fdc_id)
+        except (TypeError, ValueError):
+            return {}
+
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.columns)} FROM foods WHERE fdc_id = ?", (fdc_id,)
+            ).fetchone()
+        if row is None:
+            return {}
+        return {column: value for column, value in zip(self.columns, row) if value is not None}
+
+    def iter_foods(self) -> Iterator[Tuple[int, str, str]]:
+        """Yield (fdc_id, description, data_type) for every stored food"""
+        with self._lock:
+            rows = self._conn.execute('SELECT fdc_id, description, data_type FROM foods').fetchall()
+        yield from rows
+
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute('SELECT COUNT(*) FROM foods').fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FDCDatasetLoader:
+    """Reads FDC bulk downloads (CSV directories or JSON files) into a LocalFoodStore"""
+
+    def __init__(self, store: LocalFoodStore):
+        self.store = store
+        self.nutrient_map = store.nutrient_map
+        self._ids_by_nutrient = {nutrient_id: key for key, nutrient_id in self.nutrient_map.items()}
+        for key, fallback_ids in NUTRIENT_FALLBACKS.items():
+            if key in self.nutrient_map:
+                for nutrient_id in fallback_ids:
+                    self._ids_by_nutrient.setdefault(nutrient_id, key)
+
+    def load(self, path: str) -> int:
+        """Ingest a CSV download directory or a JSON download file, returning the number of foods stored"""
+        if os.path.isdir(path):
+            count = self.store.upsert_foods(self._read_csv_dir(path))
+        elif path.lower().endswith('.json'):
+            count = self.store.upsert_foods(self._read_json(path))
+        else:
+            raise ValueError(f"Unsupported FDC download (expected a CSV directory or .json file): {path}")
+
+        logger.info("Loaded %s foods from %s", count, path)
+        return count
+
+    def _add_nutrient(self, nutrients: Dict[str, float], nutrient_id: Any, amount: Any):
+        try:
+            key = self._ids_by_nutrient.get(int(nutrient_id))
+            if key is None or amount in (None, ''):
+                return
+            # Prefer the primary nutrient id over its fallbacks
+            if key in nutrients and int(nutrient_id) != self.nutrient_map[key]:
+                return
+            nutrients[key] = float(amount)
+        except (TypeError, ValueError):
+            return
+
+    def _read_csv_dir(self, directory: str) -> Iterator[Tuple[int, str, str, Dict[str, float]]]:
+        foods: Dict[int, Tuple[str, str]] = {}
+        with open(os.path.join(directory, 'food.csv'), newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                data_type = CSV_DATA_TYPES.get(row.get('data_type', ''))
+                if data_type:
+                    foods[int(row['fdc_id'])] = (row['description'], data_type)
+
+        nutrients_by_food: Dict[int, Dict[str, float]] = {}
+        with open(os.path.join(directory, 'food_nutrient.csv'), newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                fdc_id = int(row['fdc_id'])
+                if fdc_id in foods:
+                    self._add_nutrient(nutrients_by_food.setdefault(fdc_id, {}), row['nutrient_id'], row['amount'])
+
+        for fdc_id, (description, data_type) in foods.items():
+            yield fdc_id, description, data_type, nutrients_by_food.get(fdc_id, {})
+
+    def _read_json(self, path: str) -> Iterator[Tuple[int, str, str, Dict[str, float]]]:
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+
+        for key in JSON_FOOD_KEYS:
+            for food in document.get(key, []):
+                nutrients: Dict[str, float] = {}
+                for food_nutrient in food.get('foodNutrients', []):
+                    nutrient = food_nutrient.get('nutrient') or {}
+                    self._add_nutrient(nutrients, nutrient.get('id'), food_nutrient.get('amount'))
+                yield int(food['fdcId']), food['description'], food.get('dataType', key), nutrients
+
+
+_local_food_store: Optional[LocalFoodStore] = None
+
+
+def get_local_food_store(path: str, nutrient_map: Dict[str, int]) -> LocalFoodStore:
+    """Process-wide LocalFoodStore, opened on first use"""
+    global _local_food_store
+    if _local_food_store is None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Local FDC store not found at {path}; run ingest_fdc.py first")
+        _local_food_store = LocalFoodStore(path, nutrient_map)
+    return _local_food_store
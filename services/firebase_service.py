@@ -1,78 +1,211 @@
+import base64
 import hashlib 
+import json
 from core.firebase import db 
-from typing import Dict, Any, List
+from core.metrics import FIRESTORE_OPERATION_SECONDS, track
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from fastapi import HTTPException
-from logger import logger
+from logger import get_logger
+from google.api_core.exceptions import AlreadyExists
 from google.cloud import firestore
 
+logger = get_logger(__name__)
+
+# Fields returned for list views (select() projection); full documents carry transcripts
+RECIPE_SUMMARY_FIELDS = [
+    'video_id', 'user_id', 'title', 'description', 'is_recipe_video', 'created_at',
+    'recipe.name', 'recipe.description', 'recipe.prep_time', 'recipe.cook_time',
+    'recipe.servings', 'recipe.keywords',
+]
+COOKBOOK_SUMMARY_FIELDS = ['owner_id', 'name', 'description', 'created_at']
+
 class FirebaseService: 
     
+    # Called with the video_id after store_recipe writes, e.g. to invalidate in-process caches
+    _store_listeners: List[Callable[[str], None]] = []
+    
+    @classmethod
+    def add_store_listener(cls, listener: Callable[[str], None]):
+        cls._store_listeners.append(listener)
+    
+    @classmethod
+    def remove_store_listener(cls, listener: Callable[[str], None]):
+        """Undo add_store_listener, e.g. on shutdown so restarted containers do not pile up listeners"""
+        if listener in cls._store_listeners:
+            cls._store_listeners.remove(listener)
+    
+    @classmethod
+    def _notify_stored(cls, video_id: str):
+        for listener in cls._store_listeners:
+            try:
+                listener(video_id)
+            except Exception as e:
+                logger.error("Store listener failed for %s: %s", video_id, e)
+    
     @staticmethod 
     def hash_url(url: str) -> str: 
         return hashlib.sha256(url.encode('utf-8')).hexdigest()
     
     @staticmethod 
     def store_recipe(video_id: str, data: Dict[str, Any]): 
+        """Create the recipe document if it does not exist yet, in one round trip"""
         try:
             document_id = video_id
             document_ref = db.collection('recipes').document(document_id)
-            document = document_ref.get() 
-            
-            if document.exists:
-                return document_id
             
             data['created_at'] = datetime.now()
             data['video_id'] = video_id
             
-            document_ref.set(data) 
+            # create() fails server-side when the document exists, so concurrent writers cannot overwrite each other
+            with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='create_recipe'):
+                document_ref.create(data) 
+            FirebaseService._notify_stored(document_id)
             return document_id
         
+        except AlreadyExists:
+            # Another writer stored it first; caches may still hold a "not found" for it
+            FirebaseService._notify_stored(document_id)
+            return document_id
         except Exception as e: 
             raise HTTPException(status_code=500, detail=f"Failed to store recipe: {str(e)}")
     
+    @staticmethod
+    def store_recipes(recipes: Iterable[Tuple[str, Dict[str, Any]]], overwrite: bool = False) -> int:
+        """Bulk-store (video_id, data) pairs through RecipeBatchWriter; returns the number written"""
+        with RecipeBatchWriter(overwrite=overwrite) as writer:
+            for video_id, data in recipes:
+                writer.add(video_id, data)
+        return writer.written
+    
     @staticmethod
     def get_recipe(video_id: str) -> dict | None:
         document_id = video_id
         document_ref = db.collection('recipes').document(document_id)
-        document = document_ref.get()
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='get_recipe'):
+            document = document_ref.get()
         
         if document.exists:
-            logger.info(f"Document exists: {document.id}")
+            logger.info("Document exists: %s", document.id)
             data = document.to_dict()
             # Keep 'created_at' as string to avoid serialization issues
             required_fields = ['video_id', 'title', 'description', 'transcript', 'created_at']
             if all(field in data for field in required_fields):
                 return data
             else:
-                logger.error(f"Cached data missing required fields: {data}")
+                logger.error("Cached data for %s missing required fields: %s", video_id, [field for field in required_fields if field not in data])
                 return None
         return None
     
+    @staticmethod
+    def encode_cursor(values: Dict[str, Any]) -> str:
+        """Opaque page cursor from the last document's order-by values"""
+        encoded = {
+            key: {'datetime': value.isoformat()} if isinstance(value, datetime) else value
+            for key, value in values.items()
+        }
+        return base64.urlsafe_b64encode(json.dumps(encoded).encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Dict[str, Any]:
+        # Anything that is not a cursor we issued is the client's error, not a 500
+        try:
+            encoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if not isinstance(encoded, dict):
+                raise ValueError("cursor is not an object")
+            return {
+                key: datetime.fromisoformat(value['datetime']) if isinstance(value, dict) and 'datetime' in value else value
+                for key, value in encoded.items()
+            }
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    @staticmethod
+    def _page(query, limit: Optional[int], cursor: Optional[str], cursor_fields: List[str]) -> Tuple[List[dict], Optional[str]]:
+        """
+        Run one page of `query` (already ordered by cursor_fields + __name__); returns docs and the next cursor.
+        Without a limit every remaining document is returned and there is no next cursor.
+        """
+        if cursor:
+            query = query.start_after(FirebaseService.decode_cursor(cursor))
+        if limit is None:
+            with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='query_page'):
+                return [doc.to_dict() for doc in query.stream()], None
+        
+        # One extra document tells us whether another page exists
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='query_page'):
+            docs = list(query.limit(limit + 1).stream())
+        documents = [doc.to_dict() for doc in docs[:limit]]
+        next_cursor = None
+        if len(docs) > limit:
+            # to_dict() rather than DocumentSnapshot.get(), which raises KeyError for a missing field
+            values = {field: documents[-1].get(field) for field in cursor_fields}
+            values['__name__'] = docs[limit - 1].id
+            next_cursor = FirebaseService.encode_cursor(values)
+        return documents, next_cursor
+    
+    @staticmethod
+    def _user_recipes_query(user_id: str, fields: Optional[List[str]] = None):
+        recipes_ref = db.collection('user_recipes')
+        query = (
+            recipes_ref.where('user_id', '==', user_id)
+            .order_by('created_at', direction=firestore.Query.DESCENDING)
+            .order_by('__name__', direction=firestore.Query.DESCENDING)
+        )
+        if fields:
+            # The cursor needs created_at even when the caller did not ask for it
+            query = query.select(list(dict.fromkeys([*fields, 'created_at'])))
+        return query
+    
     @staticmethod
     def get_user_recipes(user_id: str) -> List[dict]:
         """Get all recipes for a specific user"""
-        logger.info(f"Fetching recipes for user: {user_id}")
+        logger.info("Fetching recipes for user: %s", user_id)
         
         recipes = []
-        recipes_ref = db.collection('user_recipes')
-        query = recipes_ref.where('user_id', '==', user_id).order_by('created_at', direction=firestore.Query.DESCENDING)
-        
-        for doc in query.stream():
-            recipes.append(doc.to_dict())
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='list_user_recipes'):
+            for doc in FirebaseService._user_recipes_query(user_id).stream():
+                recipes.append(doc.to_dict())
             
         return recipes
     
+    @staticmethod
+    def get_user_recipes_page(
+        user_id: str,
+        limit: Optional[int],
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """One page of a user's recipes, newest first, and the cursor for the next page (None on the last)"""
+        logger.info("Fetching %s recipes for user: %s", limit or "all", user_id)
+        return FirebaseService._page(FirebaseService._user_recipes_query(user_id, fields), limit, cursor, ['created_at'])
+    
+    @staticmethod
+    def stream_user_recipes(user_id: str, fields: Optional[List[str]] = None) -> Iterator[dict]:
+        """Yield a user's recipes as Firestore streams them, without building the full list"""
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='stream_user_recipes'):
+            for doc in FirebaseService._user_recipes_query(user_id, fields).stream():
+                yield doc.to_dict()
+    
     @staticmethod 
     def delete_recipe(user_id: str, video_id: str) -> None:
         """Delete a recipe for a specific user"""
-        logger.info(f"Deleting recipe {video_id} for user {user_id}")
+        logger.info("Deleting recipe %s for user %s", video_id, user_id)
         
         recipe_ref = db.collection('user_recipes').document(f"{user_id}_{video_id}")
-        recipe_ref.delete()
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='delete_user_recipe'):
+            recipe_ref.delete()
         
         return {"message": "Recipe deleted successfully"}
     
+    @staticmethod
+    def _user_cookbooks_query(user_id: str, fields: Optional[List[str]] = None):
+        cookbooks_ref = db.collection('cookbooks') 
+        query = cookbooks_ref.where('owner_id', '==', user_id).order_by('__name__')
+        if fields:
+            query = query.select(fields)
+        return query
+    
     @staticmethod 
     def get_user_cookbooks(user_id: str) -> List[dict]:
         """Get all cookbooks for a user
@@ -84,14 +217,91 @@ class FirebaseService:
             List[dict]: _description_
         """
         
-        logger.info(f"Fetching all cookbooks for user {user_id}")
+        logger.info("Fetching all cookbooks for user %s", user_id)
         cookbooks = [] 
-        cookbooks_ref = db.collection('cookbooks') 
-        query = cookbooks_ref.where('owner_id', '==', user_id)
-        
-        for doc in query.stream():
-            cookbooks.append(doc.to_dict())
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='list_user_cookbooks'):
+            for doc in FirebaseService._user_cookbooks_query(user_id).stream():
+                cookbooks.append(doc.to_dict())
             
         return cookbooks
-            
-        
\ No newline at end of file
+    
+    @staticmethod
+    def get_user_cookbooks_page(
+        user_id: str,
+        limit: Optional[int],
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """One page of a user's cookbooks in document id order, and the cursor for the next page"""
+        logger.info("Fetching %s cookbooks for user %s", limit or "all", user_id)
+        return FirebaseService._page(FirebaseService._user_cookbooks_query(user_id, fields), limit, cursor, [])
+    
+    @staticmethod
+    def stream_user_cookbooks(user_id: str, fields: Optional[List[str]] = None) -> Iterator[dict]:
+        with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='stream_user_cookbooks'):
+            for doc in FirebaseService._user_cookbooks_query(user_id, fields).stream():
+                yield doc.to_dict()
+
+class RecipeBatchWriter:
+    """
+    Buffers recipe writes and commits them as Firestore WriteBatches, for backfills and bulk imports.
+
+    Without `overwrite`, documents are created only if absent. A batch that hits an existing
+    document is rejected as a whole by Firestore, so that batch is retried one create() at a time.
+    """
+    
+    MAX_BATCH_WRITES = 500  # Firestore limit per batch
+    
+    def __init__(self, batch_size: int = MAX_BATCH_WRITES, overwrite: bool = False):
+        self.batch_size = min(batch_size, self.MAX_BATCH_WRITES)
+        self.overwrite = overwrite
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self.written = 0
+        self.skipped = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+    
+    def add(self, video_id: str, data: Dict[str, Any]):
+        # A copy, so the caller's dict is left as it was
+        data = {'created_at': datetime.now(), **data, 'video_id': video_id}
+        self._pending.append((video_id, data))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        collection = db.collection('recipes')
+        
+        batch = db.batch()
+        for video_id, data in pending:
+            if self.overwrite:
+                batch.set(collection.document(video_id), data)
+            else:
+                batch.create(collection.document(video_id), data)
+        
+        try:
+            with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='batch_commit'):
+                batch.commit()
+            written = [video_id for video_id, _ in pending]
+        except AlreadyExists:
+            logger.info("Batch of %s recipes hit existing documents, creating one by one", len(pending))
+            written = []
+            for video_id, data in pending:
+                try:
+                    with track(FIRESTORE_OPERATION_SECONDS, 'firestore', operation='create_recipe'):
+                        collection.document(video_id).create(data)
+                    written.append(video_id)
+                except AlreadyExists:
+                    self.skipped += 1
+        
+        self.written += len(written)
+        for video_id in written:
+            FirebaseService._notify_stored(video_id)
+        logger.info("Committed %s recipes (%s skipped as existing so far)", len(written), self.skipped)
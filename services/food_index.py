@@ -0,0 +1,217 @@
+import heapq
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Scoring weights shared by NutritionServiceV2.rank_foods and FoodSearchIndex
+EXACT_MATCH_BONUS = 100
+WORD_MATCH_WEIGHT = 10
+IN_ORDER_MULTIPLIER = 1.5
+LENGTH_PENALTY_WEIGHT = 2
+MODIFIER_PENALTY_WEIGHT = 15
+PREFERRED_CATEGORY_BONUS = 20
+BRAND_PENALTY = 10
+PREPARED_FOOD_PENALTY = 25  # New penalty for prepared foods
+MATCHING_PREP_BONUS = 15
+RAW_DEFAULT_BONUS = 10
+
+PREFERRED_DATA_TYPES = ['sr legacy', 'foundation']
+PREPARED_INDICATORS = ['sandwich', 'dish', 'recipe', 'prepared', 'with', 'served', 'in', 'on']
+BASIC_INGREDIENT_MODIFIERS = {
+    'milk': ['coconut', 'almond', 'soy', 'oat', 'rice', 'goat', 'flavored'],
+    'cheese': ['processed', 'food', 'product', 'substitute'],
+    'butter': ['substitute', 'spread', 'margarine'],
+    'cream': ['substitute', 'non-dairy', 'imitation'],
+    'oil': ['blend', 'substitute'],
+    'flour': ['blend', 'mix'],
+    'sugar': ['substitute', 'blend', 'artificial']
+}
+PREP_METHODS = ['raw', 'cooked', 'boiled', 'baked', 'fried', 'steamed', 'fresh']
+
+ALL_MODIFIERS = sorted({modifier for modifiers in BASIC_INGREDIENT_MODIFIERS.values() for modifier in modifiers})
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9%]+')
+
+
+def data_type_score(data_type: str) -> int:
+    """Bonus/penalty for the FDC data type (lowercased)"""
+    score = 0
+    if data_type in PREFERRED_DATA_TYPES:
+        score += PREFERRED_CATEGORY_BONUS
+    if 'brand' in data_type or 'branded' in data_type:
+        score -= BRAND_PENALTY
+    return score
+
+
+def prepared_food_penalty(description: str) -> int:
+    return sum(PREPARED_FOOD_PENALTY for indicator in PREPARED_INDICATORS if indicator in description)
+
+
+class _IndexedFood:
+    """Query-independent scoring features of one food, computed once at build time"""
+
+    __slots__ = (
+        'fdc_id', 'description', 'data_type', 'description_lower', 'data_type_lower',
+        'words', 'length_penalty', 'prepared_penalty', 'static_score', 'modifiers', 'preps',
+    )
+
+    def __init__(self, fdc_id: Any, description: str, data_type: str):
+        self.fdc_id = fdc_id
+        self.description = description
+        self.data_type = data_type
+        self.description_lower = description.lower()
+        self.data_type_lower = data_type.lower()
+        self.words = frozenset(self.description_lower.split())
+        self.length_penalty = len(self.words) * LENGTH_PENALTY_WEIGHT
+        self.prepared_penalty = prepared_food_penalty(self.description_lower)
+        self.static_score = data_type_score(self.data_type_lower) - self.length_penalty - self.prepared_penalty
+        self.modifiers = frozenset(m for m in ALL_MODIFIERS if m in self.description_lower)
+        self.preps = frozenset(m for m in PREP_METHODS if m in self.description_lower)
+
+
+class FoodSearchIndex:
+    """Inverted token index over a local food catalog.
+
+    Reproduces the NutritionServiceV2.rank_foods heuristics. Each food's
+    query-independent score is precomputed. Foods are numbered by that score,
+    highest first, so every posting list is already in static-score order. A
+    query walks its posting lists in that order and keeps a top-k heap. It
+    stops once no remaining food could beat the current k-th best.
+    """
+
+    def __init__(self, foods: Iterable[Tuple[Any, str, str]]):
+        indexed = [_IndexedFood(fdc_id, description, data_type) for fdc_id, description, data_type in foods]
+        indexed.sort(key=lambda food: -food.static_score)
+        self.foods: List[_IndexedFood] = indexed
+
+        postings: Dict[str, List[int]] = {}
+        self.exact: Dict[str, List[int]] = {}
+        for ordinal, food in enumerate(indexed):
+            for token in set(TOKEN_PATTERN.findall(food.description_lower)):
+                postings.setdefault(token, []).append(ordinal)
+            self.exact.setdefault(food.description_lower, []).append(ordinal)
+
+        self.postings = postings
+        self.posting_sets = {token: set(ordinals) for token, ordinals in postings.items()}
+        logger.info("Built food search index: %s foods, %s tokens", len(indexed), len(postings))
+
+    def __len__(self) -> int:
+        return len(self.foods)
+
+    def _candidates(self, tokens: List[str]) -> Iterable[int]:
+        """Foods containing every query token; falls back to any token. Yields in static-score order."""
+        lists = [self.postings[token] for token in tokens if token in self.postings]
+        if not lists:
+            return
+
+        if len(lists) == len(tokens):
+            lists.sort(key=len)
+            others = [self.posting_sets[token] for token in tokens if self.postings[token] is not lists[0]]
+            found = False
+            for ordinal in lists[0]:
+                if all(ordinal in other for other in others):
+                    found = True
+                    yield ordinal
+            if found:
+                return
+
+        yield from self._merge_unique(lists)
+
+    @staticmethod
+    def _merge_unique(lists: List[List[int]]) -> Iterable[int]:
+        previous = None
+        for ordinal in heapq.merge(*lists):
+            if ordinal != previous:
+                yield ordinal
+                previous = ordinal
+
+    def search(self, query: str, query_lower: Optional[str] = None, k: int = 1) -> List[Dict[str, Any]]:
+        """Return the k best matches for a cleaned query, best first, in rank_foods' output format"""
+        query_lower = query_lower if query_lower is not None else query.lower()
+        query_words = set(query.lower().split())
+        query_terms = query_lower.split()
+        tokens = list(dict.fromkeys(TOKEN_PATTERN.findall(query.lower())))
+        if not tokens:
+            return []
+
+        query_modifiers = [
+            modifier
+            for basic_ing, modifiers in BASIC_INGREDIENT_MODIFIERS.items() if basic_ing in query_lower
+            for modifier in modifiers if modifier not in query_lower
+        ]
+        query_preps = frozenset(method for method in PREP_METHODS if method in query_lower)
+        exact_ordinals = set(self.exact.get(query_lower, ()))
+        # Upper bound on what the query-dependent terms can add to a food's static score
+        max_bonus = (
+            (EXACT_MATCH_BONUS if exact_ordinals else 0)
+            + len(query_words) * WORD_MATCH_WEIGHT * IN_ORDER_MULTIPLIER
+            + (MATCHING_PREP_BONUS if query_preps else RAW_DEFAULT_BONUS)
+        )
+
+        heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        for ordinal in self._candidates(tokens):
+            food = self.foods[ordinal]
+            if len(heap) == k and food.static_score + max_bonus < heap[0][0]:
+                break
+
+            score = food.static_score
+            if ordinal in exact_ordinals:
+                score += EXACT_MATCH_BONUS
+
+            matching_words = query_words & food.words
+            word_match_score = len(matching_words) * WORD_MATCH_WEIGHT
+            if all(word in food.description_lower for word in query_terms):
+                word_match_score *= IN_ORDER_MULTIPLIER
+            score += word_match_score
+
+            modifier_penalty = sum(MODIFIER_PENALTY_WEIGHT for modifier in query_modifiers if modifier in food.modifiers)
+            score -= modifier_penalty
+
+            if query_preps and food.preps:
+                if query_preps == food.preps:
+                    score += MATCHING_PREP_BONUS
+            elif not query_preps and 'raw' in food.description_lower:
+                score += RAW_DEFAULT_BONUS
+
+            # Negative ordinal so that on equal scores the higher static score wins
+            rank = (score, -ordinal)
+            if len(heap) == k and rank <= heap[0][:2]:
+                continue
+
+            entry = (score, -ordinal, {
+                'fdcId': food.fdc_id,
+                'description': food.description,
+                'dataType': food.data_type,
+                'score': score,
+                'score_breakdown': {
+                    'word_match': word_match_score,
+                    'length_penalty': food.length_penalty,
+                    'modifier_penalty': modifier_penalty,
+                    'prepared_food_penalty': food.prepared_penalty,
+                    'data_type': food.data_type_lower,
+                    'matching_words': list(matching_words)
+                }
+            })
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heapreplace(heap, entry)
+
+        return [match for _, _, match in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+_food_search_index: Optional[FoodSearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_food_search_index(store) -> FoodSearchIndex:
+    """Process-wide FoodSearchIndex over a LocalFoodStore, built on first use"""
+    global _food_search_index
+    with _index_lock:
+        if _food_search_index is None:
+            _food_search_index = FoodSearchIndex(store.iter_foods())
+    return _food_search_index
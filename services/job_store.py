@@ -0,0 +1,170 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from models.schemas import JobStatus
+
+UNFINISHED_STATUSES = (JobStatus.queued.value, JobStatus.running.value)
+
+
+class JobStore:
+    """
+    Persistent record of /videos/ jobs in a local SQLite file, so queued and running jobs survive a restart.
+
+    Several uvicorn workers share the file, so every unfinished job is leased to the worker
+    (`owner`) that queued or adopted it. Owners renew their leases while alive; only jobs
+    whose lease has expired are handed to another worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                lease_expires_at REAL
+            )
+            """
+        )
+        # Files created before leases were added
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        for column, kind in (('owner', 'TEXT'), ('lease_expires_at', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        job['created_at'] = datetime.fromtimestamp(job['created_at'], tz=timezone.utc)
+        job['updated_at'] = datetime.fromtimestamp(job['updated_at'], tz=timezone.utc)
+        return job
+
+    def create(self, url: str, owner: str, lease_seconds: float) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (job_id, url, status, created_at, updated_at, owner, lease_expires_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, url, JobStatus.queued.value, now, now, owner, now + lease_seconds)
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def update(
+        self,
+        job_id: str,
+        status: Optional[JobStatus] = None,
+        stage: Optional[str] = None,
+        result: Any = None,
+        error: Optional[str] = None,
+    ):
+        fields = {'updated_at': time.time()}
+        if status is not None:
+            fields['status'] = status.value
+        if stage is not None:
+            fields['stage'] = stage
+        if result is not None:
+            fields['result'] = json.dumps(result)
+        if error is not None:
+            fields['error'] = error
+
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Mark a queued job leased to `owner` as running; False if another worker has taken it over"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND owner = ? AND status = ?',
+                (JobStatus.running.value, time.time(), job_id, owner, JobStatus.queued.value)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def renew_leases(self, owner: str, lease_seconds: float):
+        """Heartbeat: extend the lease on every unfinished job held by `owner`"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET lease_expires_at = ? WHERE owner = ? AND status IN (?, ?)',
+                (time.time() + lease_seconds, owner, *UNFINISHED_STATUSES)
+            )
+            self._conn.commit()
+
+    def release(self, owner: str):
+        """Expire the leases held by a stopping worker so another one adopts its jobs right away"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET lease_expires_at = 0 WHERE owner = ? AND status IN (?, ?)',
+                (owner, *UNFINISHED_STATUSES)
+            )
+            self._conn.commit()
+
+    def adopt_expired(self, owner: str, lease_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Take over unfinished jobs whose owner stopped renewing its lease (a crashed or
+        stopped worker), reset them to queued under `owner` and return them oldest first.
+        Jobs with a live lease belong to a running worker and are left alone.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT job_id FROM jobs WHERE status IN (?, ?) AND (lease_expires_at IS NULL OR lease_expires_at < ?)'
+                ' ORDER BY created_at',
+                (*UNFINISHED_STATUSES, now)
+            ).fetchall()
+            adopted = []
+            for row in rows:
+                # Re-check the lease so two workers sweeping at once cannot both adopt a job
+                cursor = self._conn.execute(
+                    'UPDATE jobs SET status = ?, stage = NULL, owner = ?, lease_expires_at = ?, updated_at = ?'
+                    ' WHERE job_id = ? AND status IN (?, ?) AND (lease_expires_at IS NULL OR lease_expires_at < ?)',
+                    (JobStatus.queued.value, owner, now + lease_seconds, now, row['job_id'], *UNFINISHED_STATUSES, now)
+                )
+                if cursor.rowcount == 1:
+                    adopted.append(row['job_id'])
+            self._conn.commit()
+            rows = [
+                self._conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+                for job_id in adopted
+            ]
+        return [self._to_dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
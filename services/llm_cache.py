@@ -0,0 +1,65 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from core.cache import SQLiteCache, TieredCache
+from core.config import settings
+
+
+class LLMCache:
+    """Content-addressed cache of parsed LLM responses.
+
+    Entries are keyed by a SHA-256 of the whitespace-normalized prompt, the
+    model name and the response schema. The same content therefore hits
+    regardless of which URL or endpoint it arrived through, and a schema
+    change starts a fresh key space on its own.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        memory_entries: Optional[int] = None,
+        disk_entries: Optional[int] = None,
+    ):
+        path = path if path is not None else settings.LLM_CACHE_PATH
+        self.disk = SQLiteCache(path, max_entries=disk_entries or settings.LLM_CACHE_DISK_ENTRIES) if path else None
+        self.responses = TieredCache(
+            self.disk,
+            namespace='llm_response',
+            ttl_seconds=ttl_seconds or settings.LLM_CACHE_TTL_SECONDS,
+            memory_entries=memory_entries or settings.LLM_CACHE_MEMORY_ENTRIES,
+        )
+
+    @staticmethod
+    def key(prompt: str, model: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        normalized_prompt = ' '.join(prompt.split())
+        schema_json = json.dumps(schema, sort_keys=True) if schema is not None else ''
+        return hashlib.sha256(f"{model}\n{schema_json}\n{normalized_prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Any:
+        return self.responses.get(key)
+
+    def set(self, key: str, response: Any):
+        self.responses.set(key, response)
+
+    async def get_async(self, key: str) -> Any:
+        return await self.responses.get_async(key)
+
+    async def set_async(self, key: str, response: Any):
+        await self.responses.set_async(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.responses.stats()
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide LLMCache, created on first use"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
@@ -1,7 +1,9 @@
 import os
 import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import requests
+from core.config import settings
+from core.http import get_sync_session
 from models.schemas import (
     NutritionIngredient, 
     NutritionLabel, 
@@ -9,11 +11,13 @@ from models.schemas import (
     NutritionResponse,
     IngredientNutrition
 )
+from services.fdc_bulk import FDCBulkNutrientFetcher
 
 class NutritionService:
-    def __init__(self):
+    def __init__(self, http_session: Optional[requests.Session] = None):
         self.api_key = os.getenv('FDC_API_KEY')
-        self.base_url = 'https://api.nal.usda.gov/fdc/v1'
+        self.base_url = settings.FDC_BASE_URL
+        self.http = http_session if http_session is not None else get_sync_session()
         
         # FDC nutrient ID mapping
         self.nutrient_map = {
@@ -34,6 +38,8 @@ class NutritionService:
             'potassium': 1092         # Potassium
         }
         
+        self.bulk_fetcher = FDCBulkNutrientFetcher(self.api_key, self.nutrient_map, self.base_url)
+        
     def search_food(self, query: str) -> Dict[str, Any]:
         """Search for a food item in the FDC database"""
         # Map common ingredients to specific search terms
@@ -57,7 +63,7 @@ class NutritionService:
             'pageSize': 1
         }
           
-        response = requests.get(endpoint, params=params)
+        response = self.http.get(endpoint, params=params, timeout=settings.HTTP_TIMEOUT_SECONDS)
         response.raise_for_status()
         result = response.json()
         
@@ -71,68 +77,18 @@ class NutritionService:
     
     def get_food_nutrients(self, fdc_id: str) -> Dict[str, Any]:
         """Get detailed nutrient information for a food item"""
-        endpoint = f"{self.base_url}/food/{fdc_id}"
-        params = {
-            'api_key': self.api_key
-        }
-        
+        return self.get_foods_nutrients([fdc_id]).get(str(fdc_id), {})
+    
+    def get_foods_nutrients(self, fdc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get nutrient information for many food items via the bulk /foods endpoint"""
         print(f"\n=== NUTRIENT REQUEST ===")
-        print(f"Endpoint: {endpoint}")
-        print(f"Food ID: {fdc_id}")
+        print(f"Food IDs: {fdc_ids}")
         
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        result = response.json()
+        found_nutrients = self.bulk_fetcher.fetch_sync(self.http, fdc_ids, timeout=settings.HTTP_TIMEOUT_SECONDS)
         
         print(f"\n=== NUTRIENT RESPONSE ===")
-        print(f"Status Code: {response.status_code}")
-        print(f"Raw nutrients: {result.get('foodNutrients', [])[:2]}...")  # Print first few nutrients
-        print(f"Number of nutrients: {len(result.get('foodNutrients', []))}")
-        
-        # Extract nutrients we care about
-        found_nutrients = {}
-        for nutrient in result.get('foodNutrients', []):
-            print(f"\nProcessing nutrient: {nutrient}")  # Print each nutrient being processed
-            
-            # Try different possible nutrient ID locations in the response
-            nutrient_id = None
-            amount = None
-            
-            # Handle different API response formats
-            if 'nutrient' in nutrient:
-                nutrient_id = nutrient['nutrient'].get('id')
-                amount = nutrient.get('amount')
-                print(f"Found nutrient ID from 'nutrient': {nutrient_id}, amount: {amount}")
-            elif 'nutrientId' in nutrient:
-                nutrient_id = nutrient['nutrientId']
-                amount = nutrient.get('value')
-                print(f"Found nutrient ID from 'nutrientId': {nutrient_id}, amount: {amount}")
-            else:
-                print("No nutrient ID found in this entry")
-                continue
-                
-            if nutrient_id is None or amount is None:
-                print("Missing nutrient ID or amount")
-                continue
-                
-            # Convert nutrient ID to integer for comparison
-            try:
-                nutrient_id = int(nutrient_id)
-                print(f"Converted nutrient ID to int: {nutrient_id}")
-            except (ValueError, TypeError):
-                print(f"Failed to convert nutrient ID to int: {nutrient_id}")
-                continue
-            
-            # Map the nutrient to our format
-            for our_key, fdc_id in self.nutrient_map.items():
-                if nutrient_id == fdc_id:
-                    found_nutrients[our_key] = amount
-                    print(f"Mapped nutrient {nutrient_id} to {our_key} with amount {amount}")
-                    break
-        
-        print("\nExtracted nutrients:")
-        for key, value in found_nutrients.items():
-            print(f"  {key}: {value}")
+        for fdc_id, nutrients in found_nutrients.items():
+            print(f"  {fdc_id}: {nutrients}")
             
         return found_nutrients
     
@@ -281,11 +237,10 @@ class NutritionService:
         
         total_weight = 0
         
+        # Match every ingredient first so all nutrient profiles come back in one bulk request
+        matched_foods = []
         for ingredient in ingredients:
             try:
-                # Store current ingredient name for convert_to_grams
-                self.current_ingredient = ingredient.name
-                
                 # Get clean ingredient name for API search
                 clean_name = ingredient.get_clean_name()
                 
@@ -299,10 +254,24 @@ class NutritionService:
                         print(f"No results found for either clean name or original name")
                         continue
                     
-                food = search_result['foods'][0]
+                matched_foods.append((ingredient, search_result['foods'][0]))
+            except Exception as e:
+                print(f"Error searching for ingredient {ingredient.name}: {str(e)}")
+                continue
+        
+        try:
+            nutrients_by_id = self.get_foods_nutrients([food['fdcId'] for _, food in matched_foods])
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching nutrients: {str(e)}")
+            nutrients_by_id = {}
+        
+        for ingredient, food in matched_foods:
+            try:
+                # Store current ingredient name for convert_to_grams
+                self.current_ingredient = ingredient.name
                 
                 # Get nutrients for this food
-                nutrients = self.get_food_nutrients(food['fdcId'])
+                nutrients = nutrients_by_id.get(str(food['fdcId']), {})
                
                 # Calculate amount in grams
                 amount_in_grams = self.convert_to_grams(ingredient.amount, ingredient.unit)
@@ -1,7 +1,10 @@
+import asyncio
+import logging
 import os
 import re
-from typing import List, Dict, Any, Optional
-import requests
+from typing import List, Dict, Any, Optional, Tuple
+import aiohttp
+import numpy as np
 from decimal import Decimal
 from fractions import Fraction
 from models.schemas import (
@@ -11,11 +14,98 @@ from models.schemas import (
     NutritionResponse,
     IngredientNutrition
 )
+from core.config import settings
+from core.http import HTTPClient
+from core.metrics import FDC_REQUEST_SECONDS, track
+from services.fdc_bulk import FDCBulkNutrientFetcher
+from services.fdc_cache import FDCCache, get_fdc_cache
+from services.fdc_local_store import LocalFoodStore, get_local_food_store
+from services.food_index import (
+    BASIC_INGREDIENT_MODIFIERS,
+    EXACT_MATCH_BONUS,
+    IN_ORDER_MULTIPLIER,
+    LENGTH_PENALTY_WEIGHT,
+    MATCHING_PREP_BONUS,
+    MODIFIER_PENALTY_WEIGHT,
+    PREP_METHODS,
+    RAW_DEFAULT_BONUS,
+    WORD_MATCH_WEIGHT,
+    FoodSearchIndex,
+    data_type_score,
+    get_food_search_index,
+    prepared_food_penalty,
+)
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Updated nutrient IDs based on latest FDC API
+FDC_NUTRIENT_MAP = {
+    'calories': 1008,        # Energy (kcal)
+    'total_fat': 1004,       # Total lipids (fat)
+    'saturated_fat': 1258,   # Fatty acids, total saturated
+    'trans_fat': 1257,       # Fatty acids, total trans
+    'cholesterol': 1253,     # Cholesterol
+    'sodium': 1093,          # Sodium
+    'total_carbohydrates': 1005,  # Carbohydrate, by difference
+    'dietary_fiber': 1079,    # Fiber, total dietary
+    'total_sugars': 2000,     # Sugars, total
+    'added_sugars': 1235,     # Added Sugars
+    'protein': 1003,          # Protein
+    'vitamin_d': 1114,        # Vitamin D
+    'calcium': 1087,          # Calcium
+    'iron': 1089,             # Iron
+    'potassium': 1092         # Potassium
+}
+
+# Label unit for each nutrient; calories is a bare number on NutritionLabel
+NUTRIENT_UNITS = {
+    'calories': None,
+    'total_fat': 'g',
+    'saturated_fat': 'g',
+    'trans_fat': 'g',
+    'cholesterol': 'mg',
+    'sodium': 'mg',
+    'total_carbohydrates': 'g',
+    'dietary_fiber': 'g',
+    'total_sugars': 'g',
+    'added_sugars': 'g',
+    'protein': 'g',
+    'vitamin_d': 'mcg',
+    'calcium': 'mg',
+    'iron': 'mg',
+    'potassium': 'mg'
+}
 
 class NutritionServiceV2:
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        http_client: Optional[HTTPClient] = None,
+        cache: Optional[FDCCache] = None,
+        backend: Optional[str] = None,
+        local_store: Optional[LocalFoodStore] = None,
+    ):
         self.api_key = os.getenv('FDC_API_KEY')
-        self.base_url = 'https://api.nal.usda.gov/fdc/v1'
+        self.base_url = settings.FDC_BASE_URL
+        self.cache = cache if cache is not None else get_fdc_cache()
+        
+        # 'remote' queries the FDC API, 'local' resolves everything from the ingested dataset
+        self.backend = backend or settings.FDC_BACKEND
+        if self.backend not in ('remote', 'local'):
+            raise ValueError(f"Unknown FDC backend: {self.backend}")
+        self.local_store = local_store
+        self.search_index: Optional[FoodSearchIndex] = None
+        if self.backend == 'local':
+            if self.local_store is None:
+                self.local_store = get_local_food_store(settings.FDC_LOCAL_DB_PATH, FDC_NUTRIENT_MAP)
+            self.search_index = get_food_search_index(self.local_store)
+        
+        # Pooled, retrying client; the app injects its shared instance
+        self.http = http_client if http_client is not None else HTTPClient()
+        # The service is shared by every request, so this bounds FDC calls app-wide. Matching the
+        # per-host connection pool means it never queues requests the pool could have served.
+        self.semaphore = asyncio.Semaphore(max_concurrent or self.http.limit_per_host)
         
         # FDC food mappings for common ingredients
         self.food_mappings = {
@@ -33,23 +123,9 @@ class NutritionServiceV2:
         }
         
         # Updated nutrient IDs based on latest FDC API
-        self.nutrient_map = {
-            'calories': 1008,        # Energy (kcal)
-            'total_fat': 1004,       # Total lipids (fat)
-            'saturated_fat': 1258,   # Fatty acids, total saturated
-            'trans_fat': 1257,       # Fatty acids, total trans
-            'cholesterol': 1253,     # Cholesterol
-            'sodium': 1093,          # Sodium
-            'total_carbohydrates': 1005,  # Carbohydrate, by difference
-            'dietary_fiber': 1079,    # Fiber, total dietary
-            'total_sugars': 2000,     # Sugars, total
-            'added_sugars': 1235,     # Added Sugars
-            'protein': 1003,          # Protein
-            'vitamin_d': 1114,        # Vitamin D
-            'calcium': 1087,          # Calcium
-            'iron': 1089,             # Iron
-            'potassium': 1092         # Potassium
-        }
+        self.nutrient_map = FDC_NUTRIENT_MAP
+        self.nutrient_keys = list(FDC_NUTRIENT_MAP.keys())
+        self.bulk_fetcher = FDCBulkNutrientFetcher(self.api_key, FDC_NUTRIENT_MAP, self.base_url)
 
         # Density values for common liquids (g/ml)
         self.liquid_density = {
@@ -206,7 +282,13 @@ class NutritionServiceV2:
 
         return amount * self.serving_sizes['default']
 
-    def search_food(self, query: str) -> Dict[str, Any]:
+    async def _get_json(self, path: str, params: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """GET an FDC endpoint, bounded by the shared concurrency semaphore"""
+        async with self.semaphore:
+            with track(FDC_REQUEST_SECONDS, 'fdc', endpoint=path):
+                return await self.http.request_json('GET', f"{self.base_url}{path}", params=params)
+
+    async def search_food(self, query: str) -> Dict[str, Any]:
         """Search for a food item in the FDC database with improved matching"""
         # Special case for water
         if query.lower() == 'water':
@@ -229,203 +311,168 @@ class NutritionServiceV2:
                 }]
             }
 
+        if self.backend == 'local':
+            query = re.sub(r'\([^)]*\)', '', query).strip()
+            return {'foods': self.search_index.search(query, query_lower)}
+
+        cached = await self.cache.get_search_async(query_lower)
+        if cached is not None:
+            return cached
+
         # Clean and standardize the query
         query = re.sub(r'\([^)]*\)', '', query)  # Remove parentheses and their contents
         query = query.strip()
 
-        endpoint = f"{self.base_url}/foods/search"
-        params = {
-            'api_key': self.api_key,
-            'query': query,
-            'dataType': ['Branded', 'Survey (FNDDS)', 'Foundation', 'SR Legacy'],
-            'pageSize': 25  # Increased to get more potential matches
-        }
+        params = [
+            ('api_key', self.api_key),
+            ('query', query),
+            ('pageSize', 25)  # Increased to get more potential matches
+        ]
+        params.extend(('dataType', data_type) for data_type in ['Branded', 'Survey (FNDDS)', 'Foundation', 'SR Legacy'])
 
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            result = response.json()
+            result = await self._get_json('/foods/search', params)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Error searching for food %r: %s", query, e)
+            return {'foods': []}
 
-            if not result.get('foods'):
-                return {'foods': []}
+        if not result.get('foods'):
+            await self.cache.set_search_async(query_lower, {'foods': []})
+            return {'foods': []}
+
+        best_match = self.rank_foods(query, query_lower, result['foods'])
+        await self.cache.set_search_async(query_lower, best_match)
+        return best_match
 
-            # Score and sort results for better matching
-            scored_foods = []
-            query_words = set(query.lower().split())
+    def rank_foods(self, query: str, query_lower: str, foods: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Score FDC search candidates against the query and return the best match"""
+        # Score and sort results for better matching
+        scored_foods = []
+        query_words = set(query.lower().split())
+        
+        for food in foods:
+            description = food['description'].lower()
+            description_words = set(description.split())
+            data_type = food.get('dataType', '').lower()
             
-            # Define scoring weights
-            EXACT_MATCH_BONUS = 100
-            WORD_MATCH_WEIGHT = 10
-            LENGTH_PENALTY_WEIGHT = 2
-            MODIFIER_PENALTY_WEIGHT = 15
-            PREFERRED_CATEGORY_BONUS = 20
-            BRAND_PENALTY = 10
-            PREPARED_FOOD_PENALTY = 25  # New penalty for prepared foods
+            # Initialize score components
+            score = 0
             
-            for food in result['foods']:
-                description = food['description'].lower()
-                description_words = set(description.split())
-                data_type = food.get('dataType', '').lower()
-                
-                # Initialize score components
-                score = 0
-                
-                # 1. Exact match bonus
-                if query_lower == description:
-                    score += EXACT_MATCH_BONUS
-                
-                # 2. Word matching score
-                matching_words = query_words.intersection(description_words)
-                word_match_score = len(matching_words) * WORD_MATCH_WEIGHT
-                # Extra points if matching words are in the same order
-                if all(word in description for word in query_lower.split()):
-                    word_match_score *= 1.5
-                score += word_match_score
-                
-                # 3. Length penalty (prefer shorter, more specific descriptions)
-                length_penalty = len(description_words) * LENGTH_PENALTY_WEIGHT
-                score -= length_penalty
-                
-                # 4. Preferred data type bonus
-                if data_type in ['sr legacy', 'foundation']:
-                    score += PREFERRED_CATEGORY_BONUS
-                
-                # 5. Brand name penalty
-                if 'brand' in data_type or 'branded' in data_type:
-                    score -= BRAND_PENALTY
-                
-                # 6. Prepared food penalty - penalize items that are prepared dishes
-                prepared_food_penalty = 0
-                prepared_indicators = ['sandwich', 'dish', 'recipe', 'prepared', 'with', 'served', 'in', 'on']
-                for indicator in prepared_indicators:
-                    if indicator in description:
-                        prepared_food_penalty += PREPARED_FOOD_PENALTY
-                score -= prepared_food_penalty
-                
-                # 7. Modifier penalties for basic ingredients
-                modifier_penalty = 0
-                basic_ingredients = {
-                    'milk': ['coconut', 'almond', 'soy', 'oat', 'rice', 'goat', 'flavored'],
-                    'cheese': ['processed', 'food', 'product', 'substitute'],
-                    'butter': ['substitute', 'spread', 'margarine'],
-                    'cream': ['substitute', 'non-dairy', 'imitation'],
-                    'oil': ['blend', 'substitute'],
-                    'flour': ['blend', 'mix'],
-                    'sugar': ['substitute', 'blend', 'artificial']
-                }
-                
-                for basic_ing, modifiers in basic_ingredients.items():
-                    if basic_ing in query_lower:
-                        for modifier in modifiers:
-                            if modifier in description and modifier not in query_lower:
-                                modifier_penalty += MODIFIER_PENALTY_WEIGHT
-                
-                score -= modifier_penalty
-                
-                # 8. Preparation method matching
-                prep_methods = ['raw', 'cooked', 'boiled', 'baked', 'fried', 'steamed', 'fresh']
-                query_preps = [method for method in prep_methods if method in query_lower]
-                desc_preps = [method for method in prep_methods if method in description]
-                
-                # Prefer items with matching preparation methods
-                if query_preps and desc_preps:
-                    if set(query_preps) == set(desc_preps):
-                        score += 15
-                elif not query_preps and 'raw' in description:
-                    # If no prep method specified in query, prefer raw/fresh items
-                    score += 10
-                
-                # Store detailed scoring for debugging
-                scored_foods.append((score, {
-                    'fdcId': food.get('fdcId'),
-                    'description': food.get('description'),
-                    'dataType': food.get('dataType'),
-                    'score': score,
-                    'score_breakdown': {
-                        'word_match': word_match_score,
-                        'length_penalty': length_penalty,
-                        'modifier_penalty': modifier_penalty,
-                        'prepared_food_penalty': prepared_food_penalty,
-                        'data_type': data_type,
-                        'matching_words': list(matching_words)
-                    }
-                }))
-
-            # Sort by score in descending order
-            scored_foods.sort(key=lambda x: x[0], reverse=True)
+            # 1. Exact match bonus
+            if query_lower == description:
+                score += EXACT_MATCH_BONUS
             
-            # Print top matches for debugging
-            print("\nTop 3 matches for", query)
-            for score, food in scored_foods[:3]:
-                print(f"Score {score:.1f}: {food['description']} ({food['dataType']})")
-                print(f"Breakdown: {food['score_breakdown']}")
+            # 2. Word matching score
+            matching_words = query_words.intersection(description_words)
+            word_match_score = len(matching_words) * WORD_MATCH_WEIGHT
+            # Extra points if matching words are in the same order
+            if all(word in description for word in query_lower.split()):
+                word_match_score *= IN_ORDER_MULTIPLIER
+            score += word_match_score
             
-            # Return the best match if found
-            if scored_foods:
-                return {'foods': [scored_foods[0][1]]}
-            return {'foods': []}
+            # 3. Length penalty (prefer shorter, more specific descriptions)
+            length_penalty = len(description_words) * LENGTH_PENALTY_WEIGHT
+            score -= length_penalty
             
-        except requests.exceptions.RequestException as e:
-            print(f"Error searching for food: {str(e)}")
-            return {'foods': []}
+            # 4. Preferred data type bonus / 5. Brand name penalty
+            score += data_type_score(data_type)
+            
+            # 6. Prepared food penalty - penalize items that are prepared dishes
+            prepared_penalty = prepared_food_penalty(description)
+            score -= prepared_penalty
+            
+            # 7. Modifier penalties for basic ingredients
+            modifier_penalty = 0
+            for basic_ing, modifiers in BASIC_INGREDIENT_MODIFIERS.items():
+                if basic_ing in query_lower:
+                    for modifier in modifiers:
+                        if modifier in description and modifier not in query_lower:
+                            modifier_penalty += MODIFIER_PENALTY_WEIGHT
+            
+            score -= modifier_penalty
+            
+            # 8. Preparation method matching
+            query_preps = [method for method in PREP_METHODS if method in query_lower]
+            desc_preps = [method for method in PREP_METHODS if method in description]
+            
+            # Prefer items with matching preparation methods
+            if query_preps and desc_preps:
+                if set(query_preps) == set(desc_preps):
+                    score += MATCHING_PREP_BONUS
+            elif not query_preps and 'raw' in description:
+                # If no prep method specified in query, prefer raw/fresh items
+                score += RAW_DEFAULT_BONUS
+            
+            # Store detailed scoring for debugging
+            scored_foods.append((score, {
+                'fdcId': food.get('fdcId'),
+                'description': food.get('description'),
+                'dataType': food.get('dataType'),
+                'score': score,
+                'score_breakdown': {
+                    'word_match': word_match_score,
+                    'length_penalty': length_penalty,
+                    'modifier_penalty': modifier_penalty,
+                    'prepared_food_penalty': prepared_penalty,
+                    'data_type': data_type,
+                    'matching_words': list(matching_words)
+                }
+            }))
 
-    def get_food_nutrients(self, fdc_id: str) -> Dict[str, float]:
-        """Get detailed nutrient information with improved error handling"""
-        # Special case for water
-        if fdc_id == 'water':
-            return {
-                'calories': 0,
-                'total_fat': 0,
-                'saturated_fat': 0,
-                'trans_fat': 0,
-                'cholesterol': 0,
-                'sodium': 0,
-                'total_carbohydrates': 0,
-                'dietary_fiber': 0,
-                'total_sugars': 0,
-                'added_sugars': 0,
-                'protein': 0,
-                'vitamin_d': 0,
-                'calcium': 0,
-                'iron': 0,
-                'potassium': 0
-            }
+        # Sort by score in descending order
+        scored_foods.sort(key=lambda x: x[0], reverse=True)
+        
+        # Log top matches for debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            for score, food in scored_foods[:3]:
+                logger.debug(
+                    "Match for %r: score %.1f, %s (%s), breakdown %s",
+                    query, score, food['description'], food['dataType'], food['score_breakdown']
+                )
+        
+        # Return the best match if found
+        if scored_foods:
+            return {'foods': [scored_foods[0][1]]}
+        return {'foods': []}
 
-        endpoint = f"{self.base_url}/food/{fdc_id}"
-        params = {'api_key': self.api_key}
+    async def get_food_nutrients(self, fdc_id: str) -> Dict[str, float]:
+        """Get detailed nutrient information with improved error handling"""
+        return (await self.get_foods_nutrients([fdc_id])).get(str(fdc_id), {})
+
+    async def get_foods_nutrients(self, fdc_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        """Get nutrient information for many foods, fetching cache misses through the bulk /foods endpoint"""
+        nutrients_by_id = {}
+        missing = []
+        for fdc_id in dict.fromkeys(str(fdc_id) for fdc_id in fdc_ids):
+            # Special case for water
+            if fdc_id == 'water':
+                nutrients_by_id[fdc_id] = {key: 0 for key in self.nutrient_keys}
+            elif self.backend == 'local' and (nutrients := self.local_store.get_nutrients(fdc_id)):
+                nutrients_by_id[fdc_id] = nutrients
+            else:
+                if self.backend == 'local':
+                    # e.g. a food_mappings id that the ingested data types do not include
+                    logger.warning("FDC id %s is not in the local dataset, falling back to the FDC API", fdc_id)
+                cached = await self.cache.get_food_async(fdc_id)
+                if cached is not None:
+                    nutrients_by_id[fdc_id] = cached
+                else:
+                    missing.append(fdc_id)
+
+        if not missing:
+            return nutrients_by_id
 
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            result = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching nutrients: {str(e)}")
-            return {}
-
-        nutrients = {}
-        for nutrient in result.get('foodNutrients', []):
-            nutrient_id = None
-            amount = None
-
-            # Handle different API response formats
-            if 'nutrient' in nutrient:
-                nutrient_id = nutrient['nutrient'].get('id')
-                amount = nutrient.get('amount')
-            elif 'nutrientId' in nutrient:
-                nutrient_id = nutrient['nutrientId']
-                amount = nutrient.get('value')
-
-            if nutrient_id is not None and amount is not None:
-                try:
-                    nutrient_id = int(nutrient_id)
-                    for our_key, fdc_id in self.nutrient_map.items():
-                        if nutrient_id == fdc_id:
-                            nutrients[our_key] = float(amount)
-                            break
-                except (ValueError, TypeError):
-                    continue
-
-        return nutrients
+            fetched = await self.bulk_fetcher.fetch(self.http, missing, self.semaphore)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Error fetching nutrients for %s foods: %s", len(missing), e)
+            return nutrients_by_id
+
+        for fdc_id, nutrients in fetched.items():
+            if nutrients:
+                await self.cache.set_food_async(fdc_id, nutrients)
+            nutrients_by_id[fdc_id] = nutrients
+        return nutrients_by_id
 
     def parse_ingredient_string(self, ingredient_string: str) -> List[NutritionIngredient]:
         """Parse ingredient string with improved recognition of formats"""
@@ -455,123 +502,160 @@ class NutritionServiceV2:
 
         return ingredients
 
-    def calculate_nutrition(self, ingredients: List[NutritionIngredient]) -> NutritionResponse:
-        """Calculate nutrition facts with improved accuracy"""
-        ingredient_nutrients = []
+    @staticmethod
+    def ingredient_key(name: str) -> str:
+        """Key under which identical ingredient names are resolved once"""
+        return ' '.join(name.lower().split())
+
+    async def _safe_search(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            logger.debug("Searching for: %s", name)
+            search_result = await self.search_food(name)
+        except Exception as e:
+            logger.warning("Error searching for %s: %s", name, e)
+            return None
+        if not search_result.get('foods'):
+            logger.debug("No food match found for: %s", name)
+            return None
+        matched_food = search_result['foods'][0]
+        logger.debug("Matched food for %s: %s", name, matched_food.get('description'))
+        return matched_food
+
+    async def resolve_foods(self, names: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Match each distinct ingredient name to an FDC food, concurrently"""
+        unique = {}
+        for name in names:
+            unique.setdefault(self.ingredient_key(name), name)
+        matches = await asyncio.gather(*(self._safe_search(name) for name in unique.values()))
+        return dict(zip(unique.keys(), matches))
+
+    async def resolve_profiles(self, fdc_ids: List[str]) -> Dict[str, Optional[np.ndarray]]:
+        """Fetch the per-100g nutrient profile of each distinct fdcId in as few requests as possible"""
+        unique = list(dict.fromkeys(fdc_ids))
+        try:
+            nutrients_by_id = await self.get_foods_nutrients(unique)
+        except Exception as e:
+            logger.warning("Error fetching nutrients: %s", e)
+            nutrients_by_id = {}
+
+        profiles = {}
+        for fdc_id in unique:
+            nutrients = nutrients_by_id.get(fdc_id)
+            if not nutrients:
+                logger.debug("No nutrients found for: %s", fdc_id)
+            profiles[fdc_id] = self.nutrient_vector(nutrients) if nutrients else None
+        return profiles
+
+    def nutrient_vector(self, nutrients: Dict[str, float]) -> np.ndarray:
+        """Per-100g nutrient dict as a row aligned to FDC_NUTRIENT_MAP order (missing nutrients are 0)"""
+        return np.array([nutrients.get(key, 0.0) for key in self.nutrient_keys], dtype=np.float64)
+
+    @staticmethod
+    def aggregate_nutrients(profiles: np.ndarray, grams: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scale per-100g profiles (n x nutrients) by ingredient weights (n)
+
+        Returns the per-ingredient amounts and the recipe totals. The totals come
+        from a single matrix-vector product.
+        """
+        factors = grams / 100.0
+        return profiles * factors[:, None], factors @ profiles
+
+    def build_label(self, values: List[float], serving_grams: float) -> NutritionLabel:
+        """Build a NutritionLabel from already-rounded nutrient amounts in FDC_NUTRIENT_MAP order"""
+        fields = {'serving_size': NutrientInfo.model_construct(amount=serving_grams, unit="g")}
+        for key, value in zip(self.nutrient_keys, values):
+            unit = NUTRIENT_UNITS[key]
+            fields[key] = value if unit is None else NutrientInfo.model_construct(amount=value, unit=unit)
+        # Values are produced by our own arithmetic, so skip pydantic validation
+        return NutritionLabel.model_construct(**fields)
+
+    def _assemble(
+        self,
+        ingredients: List[NutritionIngredient],
+        foods: Dict[str, Optional[Dict[str, Any]]],
+        profiles: Dict[str, Optional[np.ndarray]],
+    ) -> NutritionResponse:
+        """Build one recipe's NutritionResponse from already-resolved foods and profiles"""
         ingredient_details = []  # New list to store detailed matching info
-        total_nutrients = {key: 0 for key in self.nutrient_map.keys()}
-        total_weight = 0
+        matched = []
 
-        print(f"\n=== Starting nutrition calculation for {len(ingredients)} ingredients ===")
-        
         for ingredient in ingredients:
+            matched_food = foods.get(self.ingredient_key(ingredient.name))
+            if matched_food is None:
+                continue
             try:
-                print(f"\nProcessing ingredient: {ingredient.name}")
-                
                 # Convert amount to grams
                 amount_in_grams = self.convert_to_grams(
                     ingredient.amount or 1.0,
                     ingredient.unit,
                     ingredient.name
                 )
-                print(f"Converted amount: {amount_in_grams}g")
-                
-                # Search for ingredient
-                print(f"Searching for: {ingredient.name}")
-                search_result = self.search_food(ingredient.name)
-                if not search_result.get('foods'):
-                    print(f"No food match found for: {ingredient.name}")
-                    continue
-
-                matched_food = search_result['foods'][0]
-                print(f"Matched food: {matched_food.get('description')}")
-
-                # Store detailed matching info
-                ingredient_details.append({
-                    'original_ingredient': ingredient.dict(),
-                    'matched_food': matched_food.get('description'),
-                    'matched_id': matched_food.get('fdcId'),
-                    'data_type': matched_food.get('dataType'),
-                    'converted_amount': amount_in_grams,
-                    'original_amount': ingredient.amount,
-                    'original_unit': ingredient.unit,
-                })
-
-                # Get nutrients
-                nutrients = self.get_food_nutrients(str(matched_food['fdcId']))
-                if not nutrients:
-                    print(f"No nutrients found for: {ingredient.name}")
-                    continue
-
-                # Calculate ingredient nutrients
-                ingredient_nutrient_values = {}
-                for nutrient_key in total_nutrients.keys():
-                    if nutrient_key in nutrients:
-                        converted_amount = (nutrients[nutrient_key] * amount_in_grams) / 100
-                        ingredient_nutrient_values[nutrient_key] = converted_amount
-                        total_nutrients[nutrient_key] += converted_amount
-                        print(f"  {nutrient_key}: {converted_amount}")
-
-                total_weight += amount_in_grams
-
-                # Create nutrition label for ingredient
-                ingredient_label = NutritionLabel(
-                    serving_size=NutrientInfo(amount=amount_in_grams, unit="g"),
-                    calories=round(ingredient_nutrient_values.get('calories', 0), 1),
-                    total_fat=NutrientInfo(amount=round(ingredient_nutrient_values.get('total_fat', 0), 1), unit="g"),
-                    saturated_fat=NutrientInfo(amount=round(ingredient_nutrient_values.get('saturated_fat', 0), 1), unit="g"),
-                    trans_fat=NutrientInfo(amount=round(ingredient_nutrient_values.get('trans_fat', 0), 1), unit="g"),
-                    cholesterol=NutrientInfo(amount=round(ingredient_nutrient_values.get('cholesterol', 0), 1), unit="mg"),
-                    sodium=NutrientInfo(amount=round(ingredient_nutrient_values.get('sodium', 0), 1), unit="mg"),
-                    total_carbohydrates=NutrientInfo(amount=round(ingredient_nutrient_values.get('total_carbohydrates', 0), 1), unit="g"),
-                    dietary_fiber=NutrientInfo(amount=round(ingredient_nutrient_values.get('dietary_fiber', 0), 1), unit="g"),
-                    total_sugars=NutrientInfo(amount=round(ingredient_nutrient_values.get('total_sugars', 0), 1), unit="g"),
-                    added_sugars=NutrientInfo(amount=round(ingredient_nutrient_values.get('added_sugars', 0), 1), unit="g"),
-                    protein=NutrientInfo(amount=round(ingredient_nutrient_values.get('protein', 0), 1), unit="g"),
-                    vitamin_d=NutrientInfo(amount=round(ingredient_nutrient_values.get('vitamin_d', 0), 1), unit="mcg"),
-                    calcium=NutrientInfo(amount=round(ingredient_nutrient_values.get('calcium', 0), 1), unit="mg"),
-                    iron=NutrientInfo(amount=round(ingredient_nutrient_values.get('iron', 0), 1), unit="mg"),
-                    potassium=NutrientInfo(amount=round(ingredient_nutrient_values.get('potassium', 0), 1), unit="mg")
-                )
-
-                ingredient_nutrients.append(IngredientNutrition(
-                    ingredient=ingredient,
-                    nutrition=ingredient_label,
-                    matched_food=matched_food.get('description'),
-                    converted_amount=amount_in_grams
-                ))
-                print(f"Successfully processed {ingredient.name}")
-
             except Exception as e:
-                print(f"Error processing ingredient {ingredient.name}: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
+                logger.warning("Error processing ingredient %s: %s", ingredient.name, e)
                 continue
 
-        print(f"\nTotal nutrients calculated: {total_nutrients}")
-        
+            # Store detailed matching info
+            ingredient_details.append({
+                'original_ingredient': ingredient.dict(),
+                'matched_food': matched_food.get('description'),
+                'matched_id': matched_food.get('fdcId'),
+                'data_type': matched_food.get('dataType'),
+                'converted_amount': amount_in_grams,
+                'original_amount': ingredient.amount,
+                'original_unit': ingredient.unit,
+            })
+
+            profile = profiles.get(str(matched_food['fdcId']))
+            if profile is not None:
+                matched.append((ingredient, matched_food, profile, amount_in_grams))
+
+        grams = np.array([amount for _, _, _, amount in matched], dtype=np.float64)
+        profile_matrix = np.array([profile for _, _, profile, _ in matched], dtype=np.float64).reshape(len(matched), len(self.nutrient_keys))
+        per_ingredient, total_nutrients = self.aggregate_nutrients(profile_matrix, grams)
+
+        # Round everything in one pass; labels are only built here, at the serialization boundary
+        ingredient_nutrients = [
+            IngredientNutrition(
+                ingredient=ingredient,
+                nutrition=self.build_label(values, amount_in_grams),
+                matched_food=matched_food.get('description'),
+                converted_amount=amount_in_grams
+            )
+            for (ingredient, matched_food, _, amount_in_grams), values in zip(matched, np.round(per_ingredient, 1).tolist())
+        ]
+
         # Create total nutrition label
-        total_label = NutritionLabel(
-            serving_size=NutrientInfo(amount=total_weight, unit="g"),
-            calories=round(total_nutrients['calories'], 1),
-            total_fat=NutrientInfo(amount=round(total_nutrients['total_fat'], 1), unit="g"),
-            saturated_fat=NutrientInfo(amount=round(total_nutrients['saturated_fat'], 1), unit="g"),
-            trans_fat=NutrientInfo(amount=round(total_nutrients['trans_fat'], 1), unit="g"),
-            cholesterol=NutrientInfo(amount=round(total_nutrients['cholesterol'], 1), unit="mg"),
-            sodium=NutrientInfo(amount=round(total_nutrients['sodium'], 1), unit="mg"),
-            total_carbohydrates=NutrientInfo(amount=round(total_nutrients['total_carbohydrates'], 1), unit="g"),
-            dietary_fiber=NutrientInfo(amount=round(total_nutrients['dietary_fiber'], 1), unit="g"),
-            total_sugars=NutrientInfo(amount=round(total_nutrients['total_sugars'], 1), unit="g"),
-            added_sugars=NutrientInfo(amount=round(total_nutrients['added_sugars'], 1), unit="g"),
-            protein=NutrientInfo(amount=round(total_nutrients['protein'], 1), unit="g"),
-            vitamin_d=NutrientInfo(amount=round(total_nutrients['vitamin_d'], 1), unit="mcg"),
-            calcium=NutrientInfo(amount=round(total_nutrients['calcium'], 1), unit="mg"),
-            iron=NutrientInfo(amount=round(total_nutrients['iron'], 1), unit="mg"),
-            potassium=NutrientInfo(amount=round(total_nutrients['potassium'], 1), unit="mg")
-        )
+        total_label = self.build_label(np.round(total_nutrients, 1).tolist(), float(grams.sum()))
 
         return NutritionResponse(
             ingredients=ingredient_nutrients,
             total=total_label,
             ingredient_details=ingredient_details
-        ) 
\ No newline at end of file
+        )
+
+    async def calculate_nutrition_batch(self, recipes: List[List[NutritionIngredient]]) -> List[NutritionResponse]:
+        """Calculate nutrition facts for many recipes at once.
+
+        Ingredient names are deduplicated across every recipe and each distinct
+        name and fdcId is resolved once, so a batch costs one lookup per unique
+        food rather than one per ingredient line.
+        """
+        names = [ingredient.name for ingredients in recipes for ingredient in ingredients]
+        logger.debug("Starting nutrition calculation for %s recipes, %s ingredients", len(recipes), len(names))
+
+        foods = await self.resolve_foods(names)
+        fdc_ids = [str(food['fdcId']) for food in foods.values() if food is not None]
+        profiles = await self.resolve_profiles(fdc_ids)
+
+        logger.debug("Resolved %s unique ingredients to %s foods", len(foods), len(profiles))
+        return [self._assemble(ingredients, foods, profiles) for ingredients in recipes]
+
+    async def calculate_nutrition(self, ingredients: List[NutritionIngredient]) -> NutritionResponse:
+        """Calculate nutrition facts with improved accuracy.
+
+        Ingredients are resolved concurrently over the shared HTTP client; the
+        semaphore bounds in-flight FDC requests and results keep input order.
+        """
+        (response,) = await self.calculate_nutrition_batch([ingredients])
+        logger.debug("Total nutrients calculated: %s", response.total)
+        return response
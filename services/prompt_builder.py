@@ -0,0 +1,98 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from core.config import settings
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Input tokens we are willing to spend on video content per model (instructions are extra)
+MODEL_CONTENT_BUDGETS = {
+    'gemini-2.0-flash': 6000,
+    'anthropic.claude-3-haiku-20240307-v1:0': 4000,
+}
+
+# Filled in priority order: the title is always kept, then the description up to its cap,
+# and the transcript gets everything that is left (including unused description budget)
+TITLE_MAX_TOKENS = 50
+DESCRIPTION_MAX_SHARE = 0.25
+
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    """
+    tiktoken's encoding, loaded on first use: the first load may download the BPE file,
+    which must not happen at import. None when it cannot be loaded for any reason;
+    the character heuristic below is within ~10% for English captions.
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        logger.warning("tiktoken unavailable, approximating token counts: %s", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Local approximation of the prompt's token count (tiktoken when installed)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    truncated = text[:max_tokens * CHARS_PER_TOKEN]
+    # Avoid ending mid-word
+    match = re.match(r'(?s)(.*)\s', truncated)
+    return match.group(1) if match else truncated
+
+
+def content_budget(model: str) -> int:
+    return MODEL_CONTENT_BUDGETS.get(model, settings.PROMPT_DEFAULT_CONTENT_TOKENS)
+
+
+def fit_video_content(title: str, description: str, transcript: str, model: str, budget: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Trim title, description and transcript to the model's content budget, by priority.
+
+    Returns the trimmed fields plus the token count of each and the budget used, so callers
+    can log and predict cost.
+    """
+    budget = budget or content_budget(model)
+
+    title = truncate_to_tokens(title or '', min(TITLE_MAX_TOKENS, budget))
+    remaining = budget - count_tokens(title)
+
+    description = truncate_to_tokens(description or '', int(remaining * DESCRIPTION_MAX_SHARE))
+    remaining -= count_tokens(description)
+
+    transcript = truncate_to_tokens(transcript or '', remaining)
+
+    tokens = {
+        'title': count_tokens(title),
+        'description': count_tokens(description),
+        'transcript': count_tokens(transcript),
+    }
+    tokens['total'] = sum(tokens.values())
+    return {
+        'title': title,
+        'description': description,
+        'transcript': transcript,
+        'tokens': tokens,
+        'budget': budget,
+        'model': model,
+    }
@@ -0,0 +1,58 @@
+from typing import Any, Dict, Optional
+
+from core.cache import TTLCache
+from core.config import settings
+from models.schemas import VideoResponse
+
+# Cached marker for "Firestore has no valid document for this video"
+NOT_FOUND = object()
+
+
+class RecipeCache:
+    """In-process LRU of validated VideoResponse objects, keyed by video_id.
+
+    Misses (no document, or a document that fails validation) are cached as
+    NOT_FOUND with a short TTL so they are not refetched on every request.
+    Call invalidate() when a recipe is stored; the container registers it as
+    a FirebaseService store listener.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        negative_ttl_seconds: Optional[float] = None,
+    ):
+        self.entries = TTLCache(
+            max_entries=max_entries or settings.RECIPE_CACHE_MAX_ENTRIES,
+            ttl_seconds=ttl_seconds or settings.RECIPE_CACHE_TTL_SECONDS,
+        )
+        self.negative_ttl_seconds = negative_ttl_seconds or settings.RECIPE_CACHE_NEGATIVE_TTL_SECONDS
+        self.negative_hits = 0
+        self.invalidations = 0
+
+    def get(self, video_id: str) -> Any:
+        """Returns a VideoResponse, NOT_FOUND, or MISSING when Firestore has to be asked"""
+        value = self.entries.get(video_id)
+        if value is NOT_FOUND:
+            self.negative_hits += 1
+        return value
+
+    def set(self, video_id: str, response: VideoResponse):
+        self.entries.set(video_id, response)
+
+    def set_not_found(self, video_id: str):
+        self.entries.set(video_id, NOT_FOUND, ttl_seconds=self.negative_ttl_seconds)
+
+    def invalidate(self, video_id: str):
+        self.invalidations += 1
+        self.entries.delete(video_id)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.entries.stats()
+        stats.update({
+            'negative_hits': self.negative_hits,
+            'invalidations': self.invalidations,
+        })
+        return stats
+
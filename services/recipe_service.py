@@ -1,23 +1,42 @@
-import logging
-from typing import Optional, Tuple
+import json
+from typing import Any, AsyncIterator, Optional, Tuple
 import instructor
 from anthropic import AnthropicBedrock
+from fastapi import HTTPException
 from pydantic import ValidationError
 
 from models.schemas import Recipe, VideoContent, RecipeClassification
-from recipe_classifier import classify_video_content, classify_recipe_video_gemini
+from core.cache import MISSING
+from core.config import settings
+from logger import get_logger
+from recipe_classifier import (GEMINI_CLASSIFICATION_CONFIG, GEMINI_CLASSIFICATION_MODEL,
+                               build_gemini_classification_prompt,
+                               classify_video_content, classify_recipe_video_gemini,
+                               classify_recipe_video_gemini_async, record_claude_usage,
+                               stream_recipe_video_gemini)
+from services.llm_cache import LLMCache, get_llm_cache
 from cohere import Client 
 
+logger = get_logger(__name__)
+
 # Initialize the Anthropic client globally
-anthropic_bedrock_client = AnthropicBedrock()
+anthropic_bedrock_client = AnthropicBedrock(base_url=settings.BEDROCK_BASE_URL or None)
 client = instructor.from_anthropic(anthropic_bedrock_client)
 
 class RecipeService:
-    def __init__(self):
+    def __init__(self, llm_cache: Optional[LLMCache] = None):
         """
         Initialize RecipeService using the global client.
         """
         self.client = client
+        self.llm_cache = llm_cache if llm_cache is not None else get_llm_cache()
+
+    def _classification_key(self, video_content: VideoContent) -> str:
+        return self.llm_cache.key(
+            build_gemini_classification_prompt(video_content),
+            GEMINI_CLASSIFICATION_MODEL,
+            GEMINI_CLASSIFICATION_CONFIG['response_schema']
+        )
 
     def classify_video_content(self, video_content: VideoContent) -> RecipeClassification:
         """
@@ -30,14 +49,68 @@ class RecipeService:
             RecipeClassification object with analysis results
         """
         try:
+            key = self._classification_key(video_content)
+            cached = self.llm_cache.get(key)
+            if cached is not MISSING:
+                logger.info("Classification served from the LLM cache")
+                return cached
+
             #classification = classify_video_content(video_content)
             classification = classify_recipe_video_gemini(video_content)
-            logging.info("Successfully classified video content")
+            logger.info("Successfully classified video content")
+            self.llm_cache.set(key, classification)
+            return classification
+        except Exception as e:
+            logger.exception("Error during video classification: %s", e)
+            raise
+
+    async def classify_video_content_async(self, video_content: VideoContent) -> RecipeClassification:
+        """
+        Async variant of classify_video_content that awaits the native async Gemini client.
+        """
+        try:
+            key = self._classification_key(video_content)
+            cached = await self.llm_cache.get_async(key)
+            if cached is not MISSING:
+                logger.info("Classification served from the LLM cache")
+                return cached
+
+            classification = await classify_recipe_video_gemini_async(video_content)
+            logger.info("Successfully classified video content")
+            await self.llm_cache.set_async(key, classification)
             return classification
         except Exception as e:
-            print(f"Error during video classification: {str(e)}")
+            logger.exception("Error during video classification: %s", e)
             raise
 
+    async def classify_video_content_stream(self, video_content: VideoContent) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of classify_video_content_async.
+
+        Yields ("delta", text) for each chunk of JSON Gemini generates, then ("result", classification)
+        once it is complete. A cached classification is yielded as the result straight away.
+        """
+        key = self._classification_key(video_content)
+        cached = await self.llm_cache.get_async(key)
+        if cached is not MISSING:
+            logger.info("Classification served from the LLM cache")
+            yield "result", cached
+            return
+
+        chunks = []
+        async for text in stream_recipe_video_gemini(video_content):
+            chunks.append(text)
+            yield "delta", text
+
+        try:
+            classification = json.loads(''.join(chunks))
+        except json.JSONDecodeError as e:
+            logger.error("Streamed classification is not valid JSON: %s", e)
+            raise HTTPException(status_code=502, detail="The classification model returned an invalid response.")
+        logger.info("Successfully classified video content")
+        await self.llm_cache.set_async(key, classification)
+        yield "result", classification
+
     async def generate_recipe(self, video_url: str, prompt: str) -> Optional[Recipe]:
         """
         Generate a recipe using Claude based on the provided prompt.
@@ -65,7 +138,7 @@ class RecipeService:
         """
 
         try:
-            logging.info(f"Generating recipe for video URL: {video_url}")
+            logger.info("Generating recipe for video URL: %s", video_url)
             
             response = self.client.messages.create(
                 model="anthropic.claude-3-haiku-20240307-v1:0",
@@ -83,19 +156,20 @@ class RecipeService:
                     {"role": "user", "content": analysis_prompt}
                 ]
             )
+            record_claude_usage("anthropic.claude-3-haiku-20240307-v1:0", response)
 
             # Validate the response structure
             if not isinstance(response.ingredients, list) or not isinstance(response.instructions, list):
-                logging.error("Invalid response structure - missing required lists")
+                logger.error("Invalid response structure - missing required lists")
                 return None
 
-            logging.info(f"Recipe generated successfully for video URL: {video_url}")
+            logger.info("Recipe generated successfully for video URL: %s", video_url)
             return response
 
         except ValidationError as ve:
-            logging.error(f"Validation error while parsing Recipe: {ve}")
+            logger.error("Validation error while parsing Recipe: %s", ve)
             return None
         except Exception as e:
-            logging.error(f"Error generating recipe: {str(e)}")
+            logger.error("Error generating recipe: %s", e)
             return None
         
\ No newline at end of file
@@ -1,28 +1,199 @@
 import asyncio
 import logging
+import math
+import re
 from functools import partial
-from typing import List, Dict
+from concurrent.futures import Executor
+from typing import List, Dict, Optional, Set
 
 from youtube_transcript_api import YouTubeTranscriptApi, CouldNotRetrieveTranscript
 from fastapi import HTTPException
+import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import sent_tokenize, word_tokenize
+from nltk.tokenize import sent_tokenize
 from string import punctuation
 from heapq import nlargest
 from collections import defaultdict
 
 import cleantext
 import networkx as nx
-from itertools import combinations
+
+from core.config import settings
+from core.http import get_sync_session
 
 # Configure logging
 logger = logging.getLogger(__name__)
+
+# Sentences carrying these are what the classifier needs: ingredients, quantities and steps
+QUANTITY_PATTERN = re.compile(
+    r'\b(\d+([./]\d+)?|one|two|three|four|five|six|half|quarter|dozen)\b'
+    r'|\b(cups?|tbsp|tablespoons?|tsp|teaspoons?|grams?|g|kg|oz|ounces?|pounds?|lbs?|ml|liters?|pinch|cloves?|degrees?)\b',
+    re.IGNORECASE
+)
+INSTRUCTION_PATTERN = re.compile(
+    r'\b(add|mix|stir|whisk|chop|dice|slice|mince|bake|boil|simmer|fry|saute|sear|roast|grill|season|combine|'
+    r'pour|heat|preheat|cook|blend|fold|knead|marinate|serve|drain|spread|sprinkle|melt|reduce|cover)\b',
+    re.IGNORECASE
+)
+QUANTITY_WEIGHT = 1.0
+INSTRUCTION_WEIGHT = 0.75
+
+# Auto-generated captions are often unpunctuated; split runs longer than this into windows
+MAX_SENTENCE_WORDS = 40
+# Terms found in more than this share (or number) of sentences add edges everywhere and carry
+# little signal; skipping them keeps the graph sparse
+MAX_TERM_SENTENCE_SHARE = 0.2
+MAX_TERM_SENTENCES = 50
+CHARS_PER_TOKEN = 4
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+# (nltk.data path, download package); newer NLTK releases tokenize with punkt_tab
+NLTK_RESOURCES = (
+    ('tokenizers/punkt', 'punkt'),
+    ('tokenizers/punkt_tab', 'punkt_tab'),
+    ('corpora/stopwords', 'stopwords'),
+)
+
 class TranscriptService:
     _stop_words = set()
     _nltk_initialized = False
 
+    def __init__(self, executor: Optional[Executor] = None):
+        # None falls back to the loop's default executor
+        self.executor = executor
+
+    @staticmethod
+    def download_nltk_data():
+        """
+        Fetch missing tokenizer and stopword data. Blocking network I/O: call it at build time
+        or from startup, never on the request path.
+        """
+        for resource, package in NLTK_RESOURCES:
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                logger.info("Downloading NLTK %s", package)
+                if not nltk.download(package, quiet=True):
+                    logger.warning("Could not download NLTK %s", package)
+
+    @classmethod
+    def _init_nltk(cls):
+        # Data that is still missing here degrades condensing instead of being downloaded
+        if cls._nltk_initialized:
+            return
+        try:
+            cls._stop_words = set(stopwords.words('english')) | set(punctuation)
+        except LookupError:
+            logger.warning("NLTK stopwords unavailable, condensing without stopword removal")
+            cls._stop_words = set(punctuation)
+        cls._nltk_initialized = True
+
+    @staticmethod
+    def _split_sentences(text: str) -> List[str]:
+        try:
+            sentences = sent_tokenize(text)
+        except LookupError:
+            sentences = re.split(r'(?<=[.!?])\s+', text)
+
+        split = []
+        for sentence in sentences:
+            words = sentence.split()
+            for start in range(0, len(words), MAX_SENTENCE_WORDS):
+                split.append(' '.join(words[start:start + MAX_SENTENCE_WORDS]))
+        return split
+
+    @classmethod
+    def _terms(cls, sentence: str) -> Set[str]:
+        # A plain word regex: word_tokenize re-runs sentence splitting per call and is ~50x slower
+        words = WORD_PATTERN.findall(sentence.lower())
+        return {word for word in words if word not in cls._stop_words and len(word) > 1}
+
+    @staticmethod
+    def _similarity_graph(terms: List[Set[str]]) -> nx.Graph:
+        """
+        TextRank graph built from an inverted index, so only sentences that share a term are
+        compared instead of every pair
+        """
+        graph = nx.Graph()
+        graph.add_nodes_from(range(len(terms)))
+
+        sentences_by_term = defaultdict(list)
+        for index, sentence_terms in enumerate(terms):
+            for term in sentence_terms:
+                sentences_by_term[term].append(index)
+
+        max_share = max(2, min(MAX_TERM_SENTENCES, int(len(terms) * MAX_TERM_SENTENCE_SHARE)))
+        overlaps = defaultdict(int)
+        for indices in sentences_by_term.values():
+            if len(indices) > max_share:
+                continue
+            for position, i in enumerate(indices):
+                for j in indices[position + 1:]:
+                    overlaps[(i, j)] += 1
+
+        for (i, j), overlap in overlaps.items():
+            norm = math.log(len(terms[i]) + 1) + math.log(len(terms[j]) + 1)
+            graph.add_edge(i, j, weight=overlap / norm)
+        return graph
+
+    @classmethod
+    def condense_transcript(cls, transcript: str, max_tokens: Optional[int] = None) -> str:
+        """
+        Extractive condensation: keeps the highest-ranked sentences, favouring ingredient, quantity
+        and instruction sentences, until the token budget is used, in their original order.
+        """
+        max_tokens = max_tokens or settings.TRANSCRIPT_CONDENSE_MAX_TOKENS
+        if len(transcript) // CHARS_PER_TOKEN <= max_tokens:
+            return transcript
+
+        cls._init_nltk()
+        sentences = cls._split_sentences(transcript)
+        terms = [cls._terms(sentence) for sentence in sentences]
+
+        graph = cls._similarity_graph(terms)
+        try:
+            ranks = nx.pagerank(graph, weight='weight')
+        except nx.PowerIterationFailedConvergence:
+            ranks = {i: 1.0 / len(sentences) for i in range(len(sentences))}
+
+        # Scale TextRank to ~1 on average so the recipe cue weights are comparable
+        scale = len(sentences)
+        scores = {}
+        for i, sentence in enumerate(sentences):
+            score = ranks.get(i, 0.0) * scale
+            if QUANTITY_PATTERN.search(sentence):
+                score += QUANTITY_WEIGHT
+            if INSTRUCTION_PATTERN.search(sentence):
+                score += INSTRUCTION_WEIGHT
+            scores[i] = score
+
+        selected = []
+        budget = max_tokens * CHARS_PER_TOKEN
+        for i in nlargest(len(sentences), scores, key=scores.get):
+            cost = len(sentences[i]) + 1
+            if cost <= budget:
+                selected.append(i)
+                budget -= cost
+
+        condensed = ' '.join(sentences[i] for i in sorted(selected))
+        logger.info("Condensed transcript from %s to %s characters (%s/%s sentences)", len(transcript), len(condensed), len(selected), len(sentences))
+        return condensed
+
     @staticmethod
-    async def get_transcript(video_id: str) -> str:
+    def _fetch_transcript_list(video_id: str) -> List[Dict]:
+        """Transcript entries from YouTube, or from TRANSCRIPT_API_URL (simulators/app.py) when set"""
+        if not settings.TRANSCRIPT_API_URL:
+            return YouTubeTranscriptApi.get_transcript(video_id)
+
+        response = get_sync_session().get(
+            f"{settings.TRANSCRIPT_API_URL.rstrip('/')}/transcripts/{video_id}",
+            timeout=settings.HTTP_TIMEOUT_SECONDS
+        )
+        if response.status_code == 404:
+            raise CouldNotRetrieveTranscript(video_id)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_transcript(self, video_id: str) -> str:
         """
         Fetches and cleans the transcript of a YouTube video by its ID.
 
@@ -35,8 +206,8 @@ class TranscriptService:
         try:
             loop = asyncio.get_running_loop()
             transcript_list: list[dict] = await loop.run_in_executor(
-                None,
-                partial(YouTubeTranscriptApi.get_transcript, video_id)
+                self.executor,
+                partial(self._fetch_transcript_list, video_id)
             )
             # Clean emojis from each text entry
 
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import socket
+import uuid
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from core.concurrency import BlockingRunner
+from core.config import settings
+from logger import get_logger
+from models.schemas import JobStatus
+from services.job_store import JobStore
+from services.video_pipeline import VideoPipeline
+
+logger = get_logger(__name__)
+
+
+class VideoJobManager:
+    """Runs /videos/ pipelines in the background for the job endpoints.
+
+    Jobs are persisted in a JobStore and processed by a fixed pool of worker
+    tasks. Each manager holds a lease on the jobs it queued and renews it from
+    a heartbeat task; jobs whose lease expired (their worker crashed or
+    stopped) are adopted by whichever manager sweeps next, so a job running in
+    another uvicorn worker is never started twice. Watchers can await
+    wait_for_change() to stream progress.
+
+    JobStore calls run on a single dedicated thread, off the event loop and in
+    the order they were issued, so a stage update can never land after the
+    job's final status.
+    """
+
+    def __init__(
+        self,
+        pipeline: VideoPipeline,
+        store: JobStore,
+        workers: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.pipeline = pipeline
+        self.store = store
+        self.workers = workers or settings.VIDEO_JOB_WORKERS
+        self.lease_seconds = lease_seconds or settings.VIDEO_JOB_LEASE_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._watchers: Dict[str, int] = {}
+        self._store_runner = BlockingRunner(max_workers=1, thread_name_prefix='video-jobs')
+
+    def _store_call(self, func: Callable[..., Any], *args, **kwargs) -> asyncio.Future:
+        # Submitted right away rather than when awaited, so calls reach the store in call order
+        return asyncio.get_running_loop().run_in_executor(self._store_runner.executor, partial(func, *args, **kwargs))
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        await self._adopt_expired()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Interrupted jobs go to the next worker that sweeps instead of waiting out the lease
+        await self._store_call(self.store.release, self.owner)
+        self._store_runner.shutdown()
+
+    async def submit(self, url: str) -> Dict[str, Any]:
+        job = await self._store_call(self.store.create, url, self.owner, self.lease_seconds)
+        self._queue.put_nowait(job['job_id'])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._store_call(self.store.get, job_id)
+
+    async def wait_for_change(self, job_id: str, since: Any, timeout: float):
+        """Wait until the job's updated_at moves past `since` or `timeout` seconds pass"""
+        # Registered before the lookup so an update written meanwhile still wakes us
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        self._watchers[job_id] = self._watchers.get(job_id, 0) + 1
+        try:
+            job = await self.get(job_id)
+            if job is None or job['updated_at'] != since:
+                return
+            # Jobs run by another worker never set the event; the timeout covers them
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Drop the event with its last watcher, including one whose client disconnected
+            self._watchers[job_id] -= 1
+            if not self._watchers[job_id]:
+                del self._watchers[job_id]
+                if self._changed.get(job_id) is event:
+                    del self._changed[job_id]
+
+    def _update(self, job_id: str, **fields) -> asyncio.Future:
+        """Queue a store update and wake watchers once it is written; await the result to wait for it"""
+        future = self._store_call(self.store.update, job_id, **fields)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception() or self._notify(job_id))
+        return future
+
+    def _update_stage(self, job_id: str, stage: str):
+        # on_stage is a plain callback, so the write is not awaited; failures are only logged
+        def log_failure(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is not None:
+                logger.error("Failed to record stage %s of video job %s: %s", stage, job_id, future.exception())
+        self._update(job_id, stage=stage).add_done_callback(log_failure)
+
+    def _notify(self, job_id: str):
+        # Wake current watchers; later watchers wait on a fresh event
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _adopt_expired(self):
+        adopted = await self._store_call(self.store.adopt_expired, self.owner, self.lease_seconds)
+        for job in adopted:
+            self._queue.put_nowait(job['job_id'])
+        if adopted:
+            logger.info("Adopted %s video jobs with expired leases", len(adopted))
+
+    async def _heartbeat(self):
+        # Renew well inside the lease so a slow tick does not let it lapse
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self._store_call(self.store.renew_leases, self.owner, self.lease_seconds)
+                await self._adopt_expired()
+            except Exception as e:
+                logger.error("Video job heartbeat failed: %s", e, exc_info=True)
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error("Video job worker %s failed on %s: %s", index, job_id, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.get(job_id)
+        if job is None:
+            return
+        if not await self._store_call(self.store.claim, job_id, self.owner):
+            logger.info("Video job %s was taken over by another worker, skipping", job_id)
+            return
+        self._notify(job_id)
+        try:
+            result = await self.pipeline.process(
+                job['url'],
+                on_stage=lambda stage: self._update_stage(job_id, stage)
+            )
+        except HTTPException as e:
+            await self._update(job_id, status=JobStatus.failed, error=str(e.detail))
+        except Exception as e:
+            error_message = str(e)
+            if "Sign in to confirm you're not a bot" in error_message:
+                error_message = "YouTube has detected automated access. Please try again later or provide authentication cookies."
+            else:
+                logger.error("Error processing video job %s: %s", job_id, error_message, exc_info=True)
+                error_message = "An unexpected error occurred while processing the video."
+            await self._update(job_id, status=JobStatus.failed, error=error_message)
+        else:
+            await self._update(job_id, status=JobStatus.succeeded, stage='done', result=jsonable_encoder(result))
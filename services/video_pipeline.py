@@ -0,0 +1,296 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from core.cache import MISSING
+from core.concurrency import BlockingRunner
+from core.config import settings
+from core.metrics import PIPELINE_STAGE_SECONDS, track
+from core.singleflight import SingleFlight
+from logger import get_logger
+from models.schemas import ContentCategory, VideoContent, VideoResponse
+from services.firebase_service import FirebaseService
+from services.recipe_cache import NOT_FOUND, RecipeCache
+from services.recipe_service import RecipeService
+from services.transcript_service import TranscriptService
+from services.video_service import VideoService
+
+logger = get_logger(__name__)
+
+
+class VideoPipeline:
+    """
+    The /videos/ processing stages: cache lookup, metadata, transcript, classification, store.
+
+    Every stage that wraps a blocking SDK (Firestore, googleapiclient) runs on the
+    bounded BlockingRunner, and classification uses the native async Gemini client,
+    so one slow video never stalls the event loop for other requests.
+    """
+
+    def __init__(
+        self,
+        video_service: VideoService,
+        transcript_service: TranscriptService,
+        recipe_service: RecipeService,
+        firebase_service: FirebaseService,
+        blocking: BlockingRunner,
+        single_flight: Optional[SingleFlight] = None,
+        recipe_cache: Optional[RecipeCache] = None,
+    ):
+        self.video_service = video_service
+        self.transcript_service = transcript_service
+        self.recipe_service = recipe_service
+        self.firebase_service = firebase_service
+        self.blocking = blocking
+        self.single_flight = single_flight or SingleFlight()
+        self.recipe_cache = recipe_cache or RecipeCache()
+        # on_stage callbacks of every caller sharing an in-flight run, and the stage it is in
+        self._stage_listeners: Dict[str, List[Callable[[str], None]]] = {}
+        self._stages: Dict[str, str] = {}
+        # Event queues of process_stream() callers waiting for a streamed run to start
+        self._stream_listeners: Dict[str, List[asyncio.Queue]] = {}
+
+    async def get_cached(self, video_id: str) -> Optional[VideoResponse]:
+        cached = self.recipe_cache.get(video_id)
+        if cached is NOT_FOUND:
+            return None
+        if cached is not MISSING:
+            logger.info("Video %s served from the in-process recipe cache.", video_id)
+            return cached
+
+        logger.info("Checking if video %s exists in Firebase", video_id)
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='cache_lookup'):
+            cached_data = await self.blocking.run(self.firebase_service.get_recipe, video_id)
+        if not cached_data:
+            self.recipe_cache.set_not_found(video_id)
+            return None
+        try:
+            logger.info("Video %s already processed, returning cached data.", video_id)
+            response = VideoResponse(**cached_data)
+        except ValidationError as ve:
+            logger.error("Validation error with cached data: %s", ve)
+            # Proceed to process the video
+            self.recipe_cache.set_not_found(video_id)
+            return None
+        self.recipe_cache.set(video_id, response)
+        return response
+
+    async def fetch_metadata(self, video_id: str):
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='metadata'):
+            title, description, duration = await self.blocking.run(self.video_service.get_video_info, video_id)
+        logger.info("Fetched video info: Title='%s', Duration=%s", title, duration)
+        return title, description, duration
+
+    async def fetch_transcript(self, video_id: str) -> str:
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='transcript'):
+            transcript = await self.transcript_service.get_transcript(video_id)
+        if not transcript:
+            logger.warning("No transcript found for video %s.", video_id)
+            raise HTTPException(status_code=404, detail="Transcript not found for the video.")
+        return transcript
+
+    async def classify(self, video_content: VideoContent) -> Dict[str, Any]:
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='classify'):
+            classification = await self.recipe_service.classify_video_content_async(video_content)
+        logger.debug("Classification: %s", classification)
+        return classification
+
+    def build_video_data(self, video_id: str, title: str, description: str, transcript: str, classification: Dict[str, Any]) -> Dict[str, Any]:
+        video_data = {
+            "video_id": video_id,
+            "title": "",
+            "description": description,
+            "transcript": transcript,
+            "is_recipe_video": classification["is_recipe"] == ContentCategory.recipe,
+            "created_at": datetime.utcnow().isoformat()
+        }
+
+        if classification["is_recipe"] == ContentCategory.recipe:
+            # Only a reference copy is stored; the model budget would make every document ~5x larger
+            processed_data = self.video_service.process_recipe_for_llm(
+                title, description, transcript, budget=settings.STORED_PROMPT_MAX_TOKENS
+            )
+
+            video_data.update({
+                "processed_data": json.dumps({
+                    "classification": classification["recipe_details"],
+                    "llm_prompt": processed_data.get('prompt', '')
+                }),
+                "recipe": classification["recipe_details"],
+                "nutrition": None  # Don't calculate nutrition facts initially
+            })
+        else:
+            video_data.update({
+                "processed_data": json.dumps({
+                    "classification": classification
+                }),
+                "recipe": None,
+                "nutrition": None
+            })
+        return video_data
+
+    async def store(self, video_id: str, video_data: Dict[str, Any]):
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='store'):
+            await self.blocking.run(self.firebase_service.store_recipe, video_id, video_data)
+
+    @staticmethod
+    def _cancel(*tasks: asyncio.Task):
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            # Retrieve the exception so an abandoned task does not log "never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def process(self, url: str, on_stage: Optional[Callable[[str], None]] = None) -> Union[VideoResponse, Dict[str, Any]]:
+        """
+        Run the pipeline for a YouTube URL. `on_stage` is called with each stage name as it starts.
+        """
+        logger.info("Starting to process video URL: %s", url)
+        video_id = self.video_service.extract_video_id(url)
+        if not video_id:
+            logger.error("Failed to extract video ID from URL: %s", url)
+            raise HTTPException(status_code=400, detail="Invalid YouTube video URL")
+
+        # Concurrent requests for the same video share one pipeline run, and all of them hear its stages
+        listeners = self._stage_listeners.setdefault(video_id, [])
+        if on_stage is not None:
+            listeners.append(on_stage)
+            if video_id in self._stages:
+                on_stage(self._stages[video_id])
+        try:
+            with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='total'):
+                return await self.single_flight.do(video_id, lambda: self._process_shared(video_id))
+        finally:
+            if on_stage is not None:
+                listeners.remove(on_stage)
+            if not listeners and self._stage_listeners.get(video_id) is listeners:
+                del self._stage_listeners[video_id]
+
+    async def _process_shared(self, video_id: str) -> Union[VideoResponse, Dict[str, Any]]:
+        def on_stage(stage: str):
+            self._stages[video_id] = stage
+            for listener in list(self._stage_listeners.get(video_id, ())):
+                listener(stage)
+
+        try:
+            return await self._process(video_id, on_stage)
+        finally:
+            self._stages.pop(video_id, None)
+
+    async def _condensed_content(self, title: str, description: str, transcript: str) -> VideoContent:
+        # The LLM only sees the condensed transcript; the full one is still stored
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='condense'):
+            condensed_transcript = await self.blocking.run(self.transcript_service.condense_transcript, transcript)
+        video_content = VideoContent(
+            title=title,
+            description=description,
+            transcript=condensed_transcript
+        )
+        logger.info("Classifying %s characters of condensed transcript (%s in full)", len(condensed_transcript), len(transcript))
+        logger.debug("Video content: %s", video_content)
+        return video_content
+
+    async def _process(self, video_id: str, on_stage: Callable[[str], None]) -> Union[VideoResponse, Dict[str, Any]]:
+        on_stage('cache_lookup')
+        cached = await self.get_cached(video_id)
+        if cached is not None:
+            return cached
+
+        # Process the video as it's not cached. Metadata and transcript wait for the miss:
+        # both run on executor threads that cancelling cannot stop, so starting them
+        # alongside the lookup would spend YouTube quota and traffic on every cache hit.
+        logger.info("Video %s not found in cache, processing...", video_id)
+        on_stage('fetching')
+        (title, description, _), transcript = await asyncio.gather(self.fetch_metadata(video_id), self.fetch_transcript(video_id))
+
+        video_content = await self._condensed_content(title, description, transcript)
+
+        on_stage('classifying')
+        classification = await self.classify(video_content)
+        video_data = self.build_video_data(video_id, title, description, transcript, classification)
+
+        # Store the processed data in Firebase
+        on_stage('storing')
+        await self.store(video_id, video_data)
+        return video_data
+
+    async def process_stream(self, video_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the pipeline for an already extracted video_id, yielding an event as each stage completes:
+        cached | metadata, transcript, classification_delta..., classification, recipe.
+
+        Shares SingleFlight with process(): a caller that joins a run already in flight only
+        receives its final event (cached or recipe).
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        self._stream_listeners.setdefault(video_id, []).append(events)
+        flight = asyncio.ensure_future(self.single_flight.do(video_id, lambda: self._stream_shared(video_id)))
+        # None marks the end of the run, after every event it published
+        flight.add_done_callback(lambda _: events.put_nowait(None))
+        finished = False
+        try:
+            while (event := await events.get()) is not None:
+                finished = event["event"] in ("cached", "recipe")
+                yield event
+            # Raises whatever failed the run
+            result = await flight
+            if not finished:
+                yield {"event": "cached" if isinstance(result, VideoResponse) else "recipe", "data": result}
+        finally:
+            listeners = self._stream_listeners.get(video_id, [])
+            if events in listeners:
+                listeners.remove(events)
+                if not listeners:
+                    del self._stream_listeners[video_id]
+            # A disconnected client stops listening; the shielded run carries on for other callers
+            if not flight.done():
+                flight.cancel()
+            flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def _stream_shared(self, video_id: str) -> Union[VideoResponse, Dict[str, Any]]:
+        # Callers registered before the run started receive every event
+        listeners = self._stream_listeners.pop(video_id, [])
+        result = None
+        async for event in self._stream_events(video_id):
+            for events in listeners:
+                events.put_nowait(event)
+            if event["event"] in ("cached", "recipe"):
+                result = event["data"]
+        return result
+
+    async def _stream_events(self, video_id: str) -> AsyncIterator[Dict[str, Any]]:
+        cached = await self.get_cached(video_id)
+        if cached is not None:
+            yield {"event": "cached", "data": cached}
+            return
+
+        # As in _process, nothing is fetched from YouTube until the cache has missed
+        logger.info("Video %s not found in cache, streaming...", video_id)
+        transcript_task = asyncio.create_task(self.fetch_transcript(video_id))
+        try:
+            title, description, duration = await self.fetch_metadata(video_id)
+            yield {"event": "metadata", "data": {"video_id": video_id, "title": title, "description": description, "duration": duration}}
+
+            transcript = await transcript_task
+            yield {"event": "transcript", "data": {"video_id": video_id, "characters": len(transcript)}}
+        finally:
+            self._cancel(transcript_task)
+
+        video_content = await self._condensed_content(title, description, transcript)
+
+        classification = None
+        with track(PIPELINE_STAGE_SECONDS, 'pipeline', stage='classify_stream'):
+            async for kind, value in self.recipe_service.classify_video_content_stream(video_content):
+                if kind == "delta":
+                    yield {"event": "classification_delta", "data": {"text": value}}
+                else:
+                    classification = value
+        yield {"event": "classification", "data": classification}
+
+        video_data = self.build_video_data(video_id, title, description, transcript, classification)
+        await self.store(video_id, video_data)
+        yield {"event": "recipe", "data": video_data}
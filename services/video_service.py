@@ -2,15 +2,35 @@ from typing import Tuple, Optional, Dict
 from fastapi import HTTPException
 from yt_dlp import YoutubeDL
 import re
-from logger import logger
+from logger import get_logger
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 import os
+import threading
+
+import httplib2
+
+from core.config import settings
+from services.prompt_builder import fit_video_content
+
+logger = get_logger(__name__)
 
 class VideoService:
     def __init__(self, yt_dlp_client: Optional[YoutubeDL] = None):
         self.yt_dlp_client = yt_dlp_client
-        self.youtube = build('youtube', 'v3', developerKey=os.getenv('YOUTUBE_API_KEY'))
+        client_options = {'api_endpoint': settings.YOUTUBE_API_ENDPOINT} if settings.YOUTUBE_API_ENDPOINT else None
+        self.youtube = build('youtube', 'v3', developerKey=os.getenv('YOUTUBE_API_KEY'), client_options=client_options)
+        # httplib2.Http is not thread-safe; get_video_info runs on executor threads
+        self._local = threading.local()
+
+    def _http(self) -> httplib2.Http:
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            # build_http sets googleapiclient's redirect handling; the bare httplib2 default has no timeout
+            http = self._local.http = build_http()
+            http.timeout = settings.HTTP_TIMEOUT_SECONDS
+        return http
 
     def extract_video_id(self, url: str) -> Optional[str]:
         # YouTube URL patterns
@@ -35,10 +55,10 @@ class VideoService:
                 part="snippet,contentDetails",
                 id=video_id
             )
-            response = request.execute()
+            response = request.execute(http=self._http())
 
             if not response.get('items'):
-                logger.error(f"No video found for ID: {video_id}")
+                logger.error("No video found for ID: %s", video_id)
                 raise HTTPException(
                     status_code=404,
                     detail=f"Video not found with ID: {video_id}"
@@ -55,12 +75,12 @@ class VideoService:
             title = snippet.get('title', '')
             description = snippet.get('description', '')
 
-            logger.info(f"Successfully retrieved video info - Title: {title}, Duration: {duration}")
+            logger.info("Successfully retrieved video info - Title: %s, Duration: %s", title, duration)
             return title, description, duration
 
         except HttpError as e:
             error_message = str(e)
-            logger.error(f"YouTube API error: {error_message}")
+            logger.error("YouTube API error: %s", error_message)
             if "quotaExceeded" in error_message:
                 raise HTTPException(
                     status_code=429,
@@ -71,7 +91,7 @@ class VideoService:
                 detail=f"YouTube API error: {error_message}"
             )
         except Exception as e:
-            logger.error(f"Error fetching video info: {str(e)}")
+            logger.error("Error fetching video info: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Error fetching video info: {str(e)}"
@@ -103,17 +123,26 @@ class VideoService:
                 total_seconds = hours * 3600 + minutes * 60 + seconds
                 return total_seconds
             except Exception as e:
-                logger.error(f"Error parsing duration {duration_str}: {str(e)}")
+                logger.error("Error parsing duration %s: %s", duration_str, e)
                 return 0
         except Exception as e:
-            logger.error(f"Error parsing duration {duration_str}: {str(e)}")
+            logger.error("Error parsing duration %s: %s", duration_str, e)
             return 0
 
-    def process_recipe_for_llm(self, title: str, description: str, transcript: str) -> Dict:
+    def process_recipe_for_llm(
+        self,
+        title: str,
+        description: str,
+        transcript: str,
+        model: str = 'gemini-2.0-flash',
+        budget: Optional[int] = None,
+    ) -> Dict:
+        """`budget` overrides the model's content budget, e.g. for the copy stored in Firestore"""
+        content = fit_video_content(title, description, transcript, model, budget)
         context = {
-            "title": title,
-            "description": description[:1000],
-            "transcript": transcript[:4000]
+            "title": content["title"],
+            "description": content["description"],
+            "transcript": content["transcript"]
         }
         
         prompt = f"""
@@ -126,5 +155,6 @@ class VideoService:
         
         return {
             "context": context,
-            "prompt": prompt
+            "prompt": prompt,
+            "tokens": content["tokens"]
         }
\ No newline at end of file
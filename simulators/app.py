@@ -0,0 +1,353 @@
+"""
+Local stand-ins for the upstream APIs, for load tests and offline development.
+
+    uvicorn simulators.app:app --port 8100
+
+Then point the API at it through the environment:
+
+    FDC_BASE_URL=http://127.0.0.1:8100/fdc/v1
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8100
+    TRANSCRIPT_API_URL=http://127.0.0.1:8100
+    GEMINI_BASE_URL=http://127.0.0.1:8100
+    BEDROCK_BASE_URL=http://127.0.0.1:8100
+
+Responses come from simulators/fixtures; unknown ids and queries get deterministic
+synthetic data so load tests can use any number of distinct keys. Latency, error and
+rate-limit behaviour per upstream is set with PUT /_sim/config/{service}.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.fdc_bulk import FDC_NUTRIENT_NUMBERS
+from simulators.faults import SERVICES, FaultInjector, ServiceProfile
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return json.load(f)
+
+
+FDC_FOODS = {food['fdcId']: food for food in load_fixture('fdc_foods.json')['foods']}
+YOUTUBE_VIDEOS = {video['id']: video for video in load_fixture('youtube_videos.json')['items']}
+TRANSCRIPTS = load_fixture('transcripts.json')
+LLM_CLASSIFICATIONS = load_fixture('llm_classifications.json')
+
+RECIPE_CUES = re.compile(r'\b(cups?|tbsp|tablespoons?|tsp|teaspoons?|ingredients?|bake|simmer|saute|recipe)\b', re.IGNORECASE)
+
+app = FastAPI(title="Upstream API simulators")
+faults = FaultInjector(seed=int(os.environ['SIM_SEED']) if os.getenv('SIM_SEED') else None)
+
+
+def _stable_int(value: str, modulo: int) -> int:
+    return int(hashlib.sha1(value.encode('utf-8')).hexdigest(), 16) % modulo
+
+
+# --- Fault injection -------------------------------------------------------
+
+ERROR_RESPONSES = {
+    'fdc': {
+        'rate_limit': (429, {'error': {'code': 'OVER_RATE_LIMIT', 'message': 'You have exceeded your rate limit.'}}),
+        'error': (503, {'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Service temporarily unavailable'}}),
+    },
+    'youtube': {
+        # YouTube signals exhausted quota with a 403 whose reason is quotaExceeded
+        'rate_limit': (403, {'error': {'code': 403, 'message': 'quotaExceeded', 'errors': [{'reason': 'quotaExceeded', 'domain': 'youtube.quota'}]}}),
+        'error': (503, {'error': {'code': 503, 'message': 'backendError', 'errors': [{'reason': 'backendError'}]}}),
+    },
+    'transcript': {
+        'rate_limit': (429, {'detail': 'Too Many Requests'}),
+        'error': (500, {'detail': 'Could not retrieve a transcript'}),
+    },
+    'gemini': {
+        'rate_limit': (429, {'error': {'code': 429, 'message': 'Resource has been exhausted (e.g. check quota).', 'status': 'RESOURCE_EXHAUSTED'}}),
+        'error': (500, {'error': {'code': 500, 'message': 'An internal error has occurred.', 'status': 'INTERNAL'}}),
+    },
+    'bedrock': {
+        'rate_limit': (429, {'message': 'Too many requests, please wait before trying again.'}),
+        'error': (500, {'message': 'The server encountered an internal error.'}),
+    },
+}
+
+BEDROCK_ERROR_TYPES = {'rate_limit': 'ThrottlingException', 'error': 'InternalServerException'}
+
+
+async def inject(service: str) -> Optional[JSONResponse]:
+    """Apply the service's latency; return the fault response to send instead, if any"""
+    return fault_response(service, await faults.inject(service))
+
+
+def fault_response(service: str, fault: Optional[str]) -> Optional[JSONResponse]:
+    if fault is None:
+        return None
+
+    status_code, body = ERROR_RESPONSES[service][fault]
+    headers = {}
+    if fault == 'rate_limit':
+        headers['Retry-After'] = str(faults.profiles[service].retry_after_seconds)
+    if service == 'bedrock':
+        headers['x-amzn-ErrorType'] = BEDROCK_ERROR_TYPES[fault]
+    return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+
+@app.get("/_sim/config")
+async def get_config() -> Dict[str, ServiceProfile]:
+    return faults.profiles
+
+
+@app.put("/_sim/config/{service}")
+async def set_config(service: str, profile: ServiceProfile) -> ServiceProfile:
+    if service not in SERVICES:
+        raise HTTPException(status_code=404, detail=f"Unknown service {service}, expected one of {SERVICES}")
+    faults.profiles[service] = profile
+    return profile
+
+
+@app.get("/_sim/stats")
+async def get_stats():
+    return faults.counts
+
+
+@app.post("/_sim/reset")
+async def reset_stats():
+    faults.reset()
+    return {"message": "Counters reset"}
+
+
+# --- FDC -------------------------------------------------------------------
+
+def _synthetic_food(fdc_id: int, description: Optional[str] = None) -> Dict[str, Any]:
+    base = FDC_FOODS[sorted(FDC_FOODS)[fdc_id % len(FDC_FOODS)]]
+    return {
+        **base,
+        'fdcId': fdc_id,
+        'description': description or f"Simulated food {fdc_id}",
+    }
+
+
+def _food_by_id(fdc_id: int) -> Dict[str, Any]:
+    return FDC_FOODS.get(fdc_id) or _synthetic_food(fdc_id)
+
+
+def _search_format(food: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'fdcId': food['fdcId'],
+        'description': food['description'],
+        'dataType': food['dataType'],
+        'foodCategory': food['foodCategory'],
+        'foodNutrients': [
+            {'nutrientId': int(nutrient_id), 'value': value}
+            for nutrient_id, value in food['nutrients'].items()
+        ],
+    }
+
+
+def _full_format(food: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'fdcId': food['fdcId'],
+        'description': food['description'],
+        'dataType': food['dataType'],
+        'foodCategory': {'description': food['foodCategory']},
+        'foodNutrients': [
+            {'nutrient': {'id': int(nutrient_id)}, 'amount': value}
+            for nutrient_id, value in food['nutrients'].items()
+        ],
+    }
+
+
+@app.get("/fdc/v1/foods/search")
+async def fdc_search(query: str, pageSize: int = 50):
+    fault = await inject('fdc')
+    if fault is not None:
+        return fault
+
+    terms = set(re.findall(r'[a-z]+', query.lower()))
+    scored = []
+    for food in FDC_FOODS.values():
+        overlap = len(terms & set(re.findall(r'[a-z]+', food['description'].lower())))
+        if overlap:
+            scored.append((overlap, food))
+    scored.sort(key=lambda item: -item[0])
+    foods = [food for _, food in scored]
+
+    if not foods:
+        # Every query resolves, so load tests with arbitrary ingredients still reach the nutrient stage
+        foods = [_synthetic_food(9_000_000 + _stable_int(query.lower(), 1_000_000), description=query)]
+
+    foods = foods[:pageSize]
+    return {'totalHits': len(foods), 'foods': [_search_format(food) for food in foods]}
+
+
+@app.get("/fdc/v1/food/{fdc_id}")
+async def fdc_food(fdc_id: int):
+    fault = await inject('fdc')
+    if fault is not None:
+        return fault
+    return _full_format(_food_by_id(fdc_id))
+
+
+@app.post("/fdc/v1/foods")
+async def fdc_foods(request: Request):
+    fault = await inject('fdc')
+    if fault is not None:
+        return fault
+
+    body = await request.json()
+    numbers = set(body.get('nutrients') or [])
+
+    foods = []
+    for fdc_id in body.get('fdcIds', [])[:20]:
+        food = _food_by_id(int(fdc_id))
+        foods.append({
+            'fdcId': food['fdcId'],
+            'description': food['description'],
+            'dataType': food['dataType'],
+            'foodNutrients': [
+                {'number': str(FDC_NUTRIENT_NUMBERS[int(nutrient_id)]), 'amount': value}
+                for nutrient_id, value in food['nutrients'].items()
+                if int(nutrient_id) in FDC_NUTRIENT_NUMBERS and (not numbers or FDC_NUTRIENT_NUMBERS[int(nutrient_id)] in numbers)
+            ],
+        })
+    return foods
+
+
+# --- YouTube Data API and transcripts -----------------------------------------
+
+def _synthetic_video(video_id: str) -> Dict[str, Any]:
+    video = YOUTUBE_VIDEOS['dQw4w9WgXcQ']
+    return {**video, 'id': video_id}
+
+
+@app.get("/youtube/v3/videos")
+async def youtube_videos(id: str, part: str = "snippet,contentDetails"):
+    fault = await inject('youtube')
+    if fault is not None:
+        return fault
+
+    items = []
+    for video_id in id.split(','):
+        if video_id.startswith('missing'):
+            continue
+        items.append(YOUTUBE_VIDEOS.get(video_id) or _synthetic_video(video_id))
+    return {'kind': 'youtube#videoListResponse', 'items': items}
+
+
+@app.get("/transcripts/{video_id}")
+async def transcript(video_id: str):
+    """Same list of {text, start, duration} entries that YouTubeTranscriptApi.get_transcript returns"""
+    fault = await inject('transcript')
+    if fault is not None:
+        return fault
+    if video_id.startswith('missing'):
+        raise HTTPException(status_code=404, detail=f"No transcript for {video_id}")
+    return TRANSCRIPTS.get(video_id) or TRANSCRIPTS['dQw4w9WgXcQ']
+
+
+# --- LLMs --------------------------------------------------------------------
+
+def _classification_for(prompt: str) -> Dict[str, Any]:
+    key = 'recipe' if RECIPE_CUES.search(prompt) else 'not_a_recipe'
+    return LLM_CLASSIFICATIONS[key]
+
+
+def _gemini_prompt(body: Dict[str, Any]) -> str:
+    return ' '.join(
+        part.get('text', '')
+        for content in body.get('contents', [])
+        for part in content.get('parts', [])
+    )
+
+
+def _gemini_response(text: str, prompt: str) -> Dict[str, Any]:
+    return {
+        'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'},
+            'finishReason': 'STOP',
+            'index': 0,
+        }],
+        'usageMetadata': {
+            'promptTokenCount': len(prompt) // 4,
+            'candidatesTokenCount': len(text) // 4,
+            'totalTokenCount': (len(prompt) + len(text)) // 4,
+        },
+        'modelVersion': 'gemini-2.0-flash',
+    }
+
+
+@app.post("/{api_version}/models/{model_action}")
+async def gemini_generate(api_version: str, model_action: str, request: Request, alt: Optional[str] = Query(None)):
+    model, _, action = model_action.partition(':')
+    if action not in ('generateContent', 'streamGenerateContent'):
+        raise HTTPException(status_code=404, detail=f"Unsupported action {action}")
+
+    body = await request.json()
+    prompt = _gemini_prompt(body)
+    text = json.dumps(_classification_for(prompt))
+
+    if action == 'generateContent':
+        fault = await inject('gemini')
+        if fault is not None:
+            return fault
+        return _gemini_response(text, prompt)
+
+    # Streaming: time to first chunk is a fifth of the sampled latency, the rest is spread across chunks
+    profile = faults.profiles['gemini']
+    total = faults.sample_latency(profile)
+    await asyncio.sleep(total * 0.2)
+    fault = fault_response('gemini', faults.roll('gemini'))
+    if fault is not None:
+        return fault
+
+    chunk_size = max(1, len(text) // 5)
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    async def events():
+        for chunk in chunks:
+            yield f"data: {json.dumps(_gemini_response(chunk, prompt))}\r\n\r\n"
+            await asyncio.sleep(total * 0.8 / len(chunks))
+
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+
+@app.post("/model/{model_id}/invoke")
+async def bedrock_invoke(model_id: str, request: Request):
+    """Bedrock InvokeModel for Anthropic models, answering instructor's tool call with the fixture"""
+    fault = await inject('bedrock')
+    if fault is not None:
+        return fault
+
+    body = await request.json()
+    prompt = ' '.join(
+        message['content'] if isinstance(message.get('content'), str)
+        else ' '.join(block.get('text', '') for block in message.get('content', []))
+        for message in body.get('messages', [])
+    )
+    classification = _classification_for(prompt)
+
+    tools: List[Dict[str, Any]] = body.get('tools') or []
+    if tools:
+        content = [{'type': 'tool_use', 'id': f"toolu_sim_{int(time.time() * 1000)}", 'name': tools[0]['name'], 'input': classification}]
+        stop_reason = 'tool_use'
+    else:
+        content = [{'type': 'text', 'text': json.dumps(classification)}]
+        stop_reason = 'end_turn'
+
+    return {
+        'id': f"msg_sim_{int(time.time() * 1000)}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': model_id,
+        'content': content,
+        'stop_reason': stop_reason,
+        'stop_sequence': None,
+        'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(json.dumps(classification)) // 4},
+    }
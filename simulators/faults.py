@@ -0,0 +1,70 @@
+import asyncio
+import math
+import random
+from collections import defaultdict
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+SERVICES = ('fdc', 'youtube', 'transcript', 'gemini', 'bedrock')
+
+
+class ServiceProfile(BaseModel):
+    """Latency and failure behaviour of one simulated upstream"""
+    latency: Literal['fixed', 'uniform', 'lognormal'] = 'lognormal'
+    latency_ms: float = 100.0  # fixed value, uniform lower bound, or lognormal median
+    latency_max_ms: float = 400.0  # uniform upper bound, or lognormal p99
+    error_rate: float = Field(0.0, ge=0, le=1)  # share of requests answered with a 5xx
+    rate_limit_rate: float = Field(0.0, ge=0, le=1)  # share answered with a 429
+    retry_after_seconds: int = 1
+
+
+# Defaults roughly match the upstream timings seen in app.log
+DEFAULT_PROFILES = {
+    'fdc': ServiceProfile(latency_ms=250, latency_max_ms=900),
+    'youtube': ServiceProfile(latency_ms=400, latency_max_ms=1300),
+    'transcript': ServiceProfile(latency_ms=600, latency_max_ms=1500),
+    'gemini': ServiceProfile(latency_ms=3000, latency_max_ms=9000),
+    'bedrock': ServiceProfile(latency_ms=3500, latency_max_ms=10000),
+}
+
+
+class FaultInjector:
+    """Samples per-service latency and decides which requests fail"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.profiles: Dict[str, ServiceProfile] = {name: profile.model_copy() for name, profile in DEFAULT_PROFILES.items()}
+        self.random = random.Random(seed)
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def sample_latency(self, profile: ServiceProfile) -> float:
+        if profile.latency == 'fixed':
+            return profile.latency_ms / 1000
+        if profile.latency == 'uniform':
+            return self.random.uniform(profile.latency_ms, max(profile.latency_ms, profile.latency_max_ms)) / 1000
+
+        # Lognormal with the given median, and sigma chosen so latency_max_ms is the p99
+        median = max(profile.latency_ms, 1e-3)
+        sigma = max(math.log(max(profile.latency_max_ms, median) / median) / 2.326, 1e-6)
+        return self.random.lognormvariate(math.log(median), sigma) / 1000
+
+    async def inject(self, service: str) -> Optional[str]:
+        """Sleep for the sampled latency, then return None, 'error' or 'rate_limit'"""
+        await asyncio.sleep(self.sample_latency(self.profiles[service]))
+        return self.roll(service)
+
+    def roll(self, service: str) -> Optional[str]:
+        """Decide the outcome of one request without sleeping"""
+        profile = self.profiles[service]
+        roll = self.random.random()
+        if roll < profile.rate_limit_rate:
+            outcome = 'rate_limit'
+        elif roll < profile.rate_limit_rate + profile.error_rate:
+            outcome = 'error'
+        else:
+            outcome = 'ok'
+        self.counts[service][outcome] += 1
+        return None if outcome == 'ok' else outcome
+
+    def reset(self):
+        self.counts.clear()
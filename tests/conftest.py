@@ -0,0 +1,12 @@
+import os
+import sys
+import types
+
+# Importing logger.py configures handlers; keep test runs out of the tracked app.log
+os.environ.setdefault('LOG_FILE', '')
+# The Bedrock clients are created at import and need a region, though tests never call them
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+
+# core.firebase connects to Firestore with the service account at import; tests that need
+# a client patch services.firebase_service.db themselves
+sys.modules.setdefault('core.firebase', types.SimpleNamespace(db=None))
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from core import cache
+from core.cache import MISSING, SQLiteCache, TieredCache, TTLCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def disk(tmp_path):
+    disk = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    yield disk
+    disk.close()
+
+
+def test_ttl_cache_expires_entries(clock):
+    memory = TTLCache(ttl_seconds=10)
+    memory.set('a', 1)
+
+    clock.now += 9.9
+    assert memory.get('a') == 1
+    clock.now += 0.1
+    assert memory.get('a') is MISSING
+    assert len(memory) == 0
+    assert (memory.hits, memory.misses) == (1, 1)
+
+
+def test_ttl_cache_per_entry_ttl_and_falsy_values(clock):
+    memory = TTLCache(ttl_seconds=10)
+    memory.set('short', 0, ttl_seconds=1)
+    memory.set('forever', [], ttl_seconds=None)
+
+    clock.now += 5
+    assert memory.get('short') is MISSING
+    assert memory.get('forever') == []
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    memory = TTLCache(max_entries=2)
+    memory.set('a', 1)
+    memory.set('b', 2)
+    memory.get('a')  # b is now least recently used
+    memory.set('c', 3)
+
+    assert memory.get('b') is MISSING
+    assert memory.get('a') == 1
+    assert memory.get('c') == 3
+    assert memory.evictions == 1
+
+
+def test_sqlite_cache_expiry_and_namespaces(disk, clock):
+    disk.set('ns', 'k', {'x': 1}, ttl_seconds=10)
+    disk.set('other', 'k', 'other value')
+
+    assert disk.get('ns', 'k') == {'x': 1}
+    assert disk.get('other', 'k') == 'other value'
+    clock.now += 10
+    assert disk.get('ns', 'k') is MISSING
+    assert disk.get('other', 'k') == 'other value'
+
+
+def test_sqlite_cache_prunes_least_recently_accessed(tmp_path, clock):
+    disk = SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    try:
+        for key in ('a', 'b', 'c'):
+            clock.now += 1
+            disk.set('ns', key, key)
+        clock.now += 1
+        disk.get('ns', 'a')  # buffered access time, flushed by the prune
+        disk._prune()
+
+        assert disk.count() == 2
+        assert disk.get('ns', 'b') is MISSING
+        assert disk.get('ns', 'a') == 'a'
+        assert disk.get('ns', 'c') == 'c'
+    finally:
+        disk.close()
+
+
+def test_tiered_cache_promotes_disk_hits_with_their_expiry(disk, clock):
+    disk.set('ns', 'k', 'v', ttl_seconds=10)
+    tiered = TieredCache(disk, 'ns', ttl_seconds=100, warm_start=False)
+
+    assert tiered.get('k') == 'v'
+    assert tiered.get('k') == 'v'
+    stats = tiered.stats()
+    assert (stats['hits'], stats['misses'], stats['disk_hits'], stats['disk_misses']) == (1, 1, 1, 0)
+
+    # The promoted entry keeps the disk expiry, not the tier's longer TTL
+    clock.now += 10
+    assert tiered.get('k') is MISSING
+    assert tiered.stats()['disk_misses'] == 1
+
+
+def test_tiered_cache_get_async_promotes(disk):
+    disk.set('ns', 'k', {'v': 1})
+    tiered = TieredCache(disk, 'ns', warm_start=False)
+
+    assert asyncio.run(tiered.get_async('k')) == {'v': 1}
+    assert tiered.disk_hits == 1
+    assert tiered.memory.get('k') == {'v': 1}
+
+
+def test_tiered_cache_set_async_writes_through(disk):
+    tiered = TieredCache(disk, 'ns', ttl_seconds=60, warm_start=False)
+    asyncio.run(tiered.set_async('k', 'v'))
+
+    assert tiered.memory.get('k') == 'v'
+    assert disk.get('ns', 'k') == 'v'
+
+
+def test_tiered_cache_warm_start_loads_most_recent(disk, clock):
+    for key in ('a', 'b', 'c'):
+        clock.now += 1
+        disk.set('ns', key, key)
+
+    tiered = TieredCache(disk, 'ns', memory_entries=2)
+
+    assert len(tiered.memory) == 2
+    assert tiered.memory.get('a') is MISSING
+    assert tiered.memory.get('c') == 'c'
@@ -0,0 +1,171 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from services.firebase_service import FirebaseService
+
+
+class FakeSnapshot:
+    """Just enough of a DocumentSnapshot: get() raises KeyError for a missing field, like the real one"""
+
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def get(self, field):
+        return self._data[field]
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeQuery:
+    """An already ordered query; records the start_after() values and limit it was given"""
+
+    def __init__(self, docs, start_after=None, limit=None):
+        self.docs = docs
+        self.start_after_values = start_after
+        self.limit_value = limit
+
+    def start_after(self, values):
+        return FakeQuery(self.docs, values, self.limit_value)
+
+    def limit(self, count):
+        return FakeQuery(self.docs, self.start_after_values, count)
+
+    def stream(self):
+        docs = self.docs
+        if self.start_after_values is not None:
+            position = next(i for i, doc in enumerate(docs) if doc.id == self.start_after_values['__name__'])
+            last = docs[position].to_dict()
+            # The cursor must carry the order-by values of the document it points at
+            for field, value in self.start_after_values.items():
+                if field != '__name__':
+                    assert last.get(field) == value
+            docs = docs[position + 1:]
+        return iter(docs[:self.limit_value] if self.limit_value is not None else docs)
+
+
+def recipes(count):
+    newest = datetime(2024, 5, 1, 12, 30)
+    return [
+        FakeSnapshot(f"doc{i}", {'title': f"Recipe {i}", 'created_at': newest - timedelta(hours=i)})
+        for i in range(count)
+    ]
+
+
+def encoded(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+
+def test_cursor_round_trips_datetimes():
+    values = {'created_at': datetime(2024, 5, 1, 12, 30, 15, 123456), '__name__': 'doc3', 'n': 2}
+    assert FirebaseService.decode_cursor(FirebaseService.encode_cursor(values)) == values
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!',
+    'bm90IGpzb24',                               # base64, but not JSON
+    encoded([1, 2]),                             # JSON, but not an object
+    encoded(5),
+    encoded({'created_at': {'datetime': 'yesterday'}}),
+    'é',
+])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        FirebaseService.decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+def test_page_follows_cursors_to_the_last_page():
+    query = FakeQuery(recipes(5))
+    pages, cursor = [], None
+    while True:
+        docs, cursor = FirebaseService._page(query, 2, cursor, ['created_at'])
+        pages.append([doc['title'] for doc in docs])
+        if cursor is None:
+            break
+
+    assert pages == [['Recipe 0', 'Recipe 1'], ['Recipe 2', 'Recipe 3'], ['Recipe 4']]
+
+
+def test_page_asks_for_one_extra_document():
+    query = FakeQuery(recipes(2))
+    original_limit = query.limit
+    seen = []
+    query.limit = lambda count: seen.append(count) or original_limit(count)
+
+    docs, cursor = FirebaseService._page(query, 2, None, ['created_at'])
+    assert seen == [3]
+    assert len(docs) == 2
+    # Exactly `limit` documents left: no phantom next page
+    assert cursor is None
+
+
+def test_page_without_limit_returns_everything():
+    docs, cursor = FirebaseService._page(FakeQuery(recipes(4)), None, None, ['created_at'])
+    assert len(docs) == 4
+    assert cursor is None
+
+
+def test_next_cursor_tolerates_a_missing_order_field():
+    docs = recipes(3)
+    del docs[1]._data['created_at']
+
+    page, cursor = FirebaseService._page(FakeQuery(docs), 2, None, ['created_at'])
+    assert len(page) == 2
+    assert FirebaseService.decode_cursor(cursor) == {'created_at': None, '__name__': 'doc1'}
+
+
+def test_cookbook_cursor_is_the_document_name_only():
+    cookbooks = [FakeSnapshot(f"book{i}", {'name': f"Book {i}"}) for i in range(3)]
+    query = FakeQuery(cookbooks)
+
+    first, cursor = FirebaseService._page(query, 2, None, [])
+    assert FirebaseService.decode_cursor(cursor) == {'__name__': 'book1'}
+
+    second, cursor = FirebaseService._page(query, 2, cursor, [])
+    assert [doc['name'] for doc in first + second] == ['Book 0', 'Book 1', 'Book 2']
+    assert cursor is None
+
+
+@pytest.fixture
+def firestore_db(monkeypatch):
+    """A real Firestore client that only builds queries; nothing here talks to the server"""
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore
+
+    import services.firebase_service as firebase_service
+
+    client = firestore.Client(project='test', credentials=AnonymousCredentials())
+    monkeypatch.setattr(firebase_service, 'db', client)
+    return client
+
+
+def test_cookbook_cursor_converts_to_a_firestore_reference(firestore_db):
+    cursor = FirebaseService.encode_cursor({'__name__': 'book1'})
+    query = FirebaseService._user_cookbooks_query('user').start_after(FirebaseService.decode_cursor(cursor))
+
+    start_at = query._to_protobuf().start_at
+    assert not start_at.before
+    assert [value.reference_value for value in start_at.values] == [
+        'projects/test/databases/(default)/documents/cookbooks/book1'
+    ]
+
+
+def test_recipe_cursor_matches_the_query_order(firestore_db):
+    created_at = datetime(2024, 5, 1, 12, 30)
+    cursor = FirebaseService.encode_cursor({'created_at': created_at, '__name__': 'user_video'})
+    query = FirebaseService._user_recipes_query('user', ['title']).start_after(FirebaseService.decode_cursor(cursor))
+
+    proto = query._to_protobuf()
+    assert [order.field.field_path for order in proto.order_by] == ['created_at', '__name__']
+    timestamp, reference = proto.start_at.values
+    # Firestore reads naive datetimes as UTC
+    assert timestamp.timestamp_value == created_at.replace(tzinfo=timezone.utc)
+    assert reference.reference_value.endswith('/documents/user_recipes/user_video')
+    # The projection keeps created_at so the next cursor can be built
+    assert {field.field_path for field in proto.select.fields} == {'title', 'created_at'}
@@ -0,0 +1,89 @@
+import pytest
+
+from services.food_index import TOKEN_PATTERN, FoodSearchIndex
+from services.nutrition_service_v2 import NutritionServiceV2
+
+FOODS = [
+    (1, 'Milk, whole, 3.25% milkfat', 'SR Legacy'),
+    (2, 'Milk, reduced fat, fluid, 2% milkfat', 'SR Legacy'),
+    (3, 'Beverages, almond milk, unsweetened', 'SR Legacy'),
+    (4, 'Milk, coconut, raw', 'Foundation'),
+    (5, 'WHOLE MILK', 'Branded'),
+    (6, 'Chicken, broilers or fryers, breast, meat only, raw', 'SR Legacy'),
+    (7, 'Chicken breast, baked', 'Survey (FNDDS)'),
+    (8, 'Chicken breast sandwich with cheese', 'Survey (FNDDS)'),
+    (9, 'Chicken breast, fried', 'Foundation'),
+    (10, 'Rice, white, long-grain, regular, cooked', 'SR Legacy'),
+    (11, 'Rice, white, long-grain, regular, raw', 'SR Legacy'),
+    (12, 'Rice pudding', 'Survey (FNDDS)'),
+    (13, 'Garlic, raw', 'Foundation'),
+    (14, 'Garlic bread', 'Survey (FNDDS)'),
+    (15, 'Oil, olive, salad or cooking', 'SR Legacy'),
+    (16, 'Olive oil blend', 'Branded'),
+    (17, 'Butter, salted', 'SR Legacy'),
+    (18, 'Butter substitute spread', 'Branded'),
+    (19, 'Sugar, granulated', 'SR Legacy'),
+    (20, 'Sugar substitute, artificial sweetener', 'Branded'),
+    (21, 'Flour, wheat, all-purpose, enriched', 'SR Legacy'),
+    (22, 'Tomatoes, red, ripe, raw', 'Foundation'),
+    (23, 'Tomatoes, canned, in tomato juice', 'SR Legacy'),
+    (24, 'Egg, whole, raw, fresh', 'SR Legacy'),
+    (25, 'Egg, whole, cooked, fried', 'SR Legacy'),
+    (26, 'garlic', 'Foundation'),
+]
+
+QUERIES = [
+    'milk', 'whole milk', 'almond milk', 'chicken breast', 'baked chicken breast', 'white rice',
+    'cooked white rice', 'garlic', 'olive oil', 'butter', 'sugar', 'all-purpose flour',
+    'tomatoes', 'egg', 'fried egg', 'rice', 'chicken', 'coconut milk', 'pudding', 'salmon',
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return FoodSearchIndex(FOODS)
+
+
+def rank_foods(query, foods):
+    service = NutritionServiceV2.__new__(NutritionServiceV2)
+    return service.rank_foods(query, query.lower(), foods)['foods']
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_matches_rank_foods(index, query):
+    # rank_foods scores whatever the FDC API returned; give it the index's candidate set
+    tokens = list(dict.fromkeys(TOKEN_PATTERN.findall(query)))
+    candidates = [
+        {'fdcId': food.fdc_id, 'description': food.description, 'dataType': food.data_type}
+        for food in (index.foods[ordinal] for ordinal in index._candidates(tokens))
+    ]
+    expected = rank_foods(query, candidates)
+    actual = index.search(query)
+
+    assert len(actual) == len(expected)
+    if not expected:
+        return
+    assert actual[0]['score'] == expected[0]['score']
+    # matching_words comes from a set, so only its contents are comparable
+    actual_breakdown, expected_breakdown = dict(actual[0]['score_breakdown']), dict(expected[0]['score_breakdown'])
+    assert sorted(actual_breakdown.pop('matching_words')) == sorted(expected_breakdown.pop('matching_words'))
+    assert actual_breakdown == expected_breakdown
+    # Equal scores may be broken differently; the index must still pick one of the tied foods
+    top_score = expected[0]['score']
+    tied = {food['fdcId'] for food in candidates if rank_foods(query, [food])[0]['score'] == top_score}
+    assert actual[0]['fdcId'] in tied
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_top_k_matches_full_scan(index, query):
+    """The early exit must not drop a food that a full scan ranks in the top k"""
+    tokens = list(dict.fromkeys(TOKEN_PATTERN.findall(query)))
+    scores = sorted(
+        (
+            rank_foods(query, [{'fdcId': food.fdc_id, 'description': food.description, 'dataType': food.data_type}])[0]['score']
+            for food in (index.foods[ordinal] for ordinal in index._candidates(tokens))
+        ),
+        reverse=True,
+    )
+    actual = index.search(query, k=3)
+    assert [match['score'] for match in actual] == scores[:3]
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from models.schemas import JobStatus
+from services import job_store
+from services.job_store import JobStore
+from services.video_jobs import VideoJobManager
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_store.time, 'time', clock)
+    return clock
+
+
+def test_live_lease_is_not_adopted(store, clock):
+    job = store.create('https://youtu.be/a', 'worker-a', lease_seconds=60)
+    assert store.claim(job['job_id'], 'worker-a')
+
+    clock.now += 59
+    assert store.adopt_expired('worker-b', 60) == []
+    assert store.get(job['job_id'])['status'] == JobStatus.running
+
+
+def test_expired_lease_is_reclaimed_once(store, clock):
+    job = store.create('https://youtu.be/a', 'worker-a', lease_seconds=60)
+    assert store.claim(job['job_id'], 'worker-a')
+    store.update(job['job_id'], stage='classifying')
+
+    clock.now += 61
+    adopted = store.adopt_expired('worker-b', 60)
+    assert [j['job_id'] for j in adopted] == [job['job_id']]
+    assert adopted[0]['status'] == JobStatus.queued
+    assert adopted[0]['stage'] is None
+    assert adopted[0]['owner'] == 'worker-b'
+
+    # A second sweeper finds nothing, and the crashed owner can no longer claim it
+    assert store.adopt_expired('worker-c', 60) == []
+    assert not store.claim(job['job_id'], 'worker-a')
+    assert store.claim(job['job_id'], 'worker-b')
+
+
+def test_heartbeat_keeps_the_lease(store, clock):
+    job = store.create('https://youtu.be/a', 'worker-a', lease_seconds=60)
+    for _ in range(5):
+        clock.now += 30
+        store.renew_leases('worker-a', 60)
+    assert store.adopt_expired('worker-b', 60) == []
+    assert store.get(job['job_id'])['owner'] == 'worker-a'
+
+
+def test_released_jobs_are_adopted_right_away(store, clock):
+    job = store.create('https://youtu.be/a', 'worker-a', lease_seconds=60)
+    store.release('worker-a')
+    assert [j['job_id'] for j in store.adopt_expired('worker-b', 60)] == [job['job_id']]
+
+
+def test_finished_jobs_are_never_adopted(store, clock):
+    job = store.create('https://youtu.be/a', 'worker-a', lease_seconds=60)
+    store.update(job['job_id'], status=JobStatus.succeeded)
+    clock.now += 3600
+    assert store.adopt_expired('worker-b', 60) == []
+
+
+class FakePipeline:
+    def __init__(self):
+        self.urls = []
+
+    async def process(self, url, on_stage=None):
+        self.urls.append(url)
+        for stage in ('cache_lookup', 'fetching', 'classifying', 'storing'):
+            on_stage(stage)
+        return {'url': url}
+
+
+async def wait_until_finished(manager: VideoJobManager, job_id: str, timeout: float = 5):
+    job = await manager.get(job_id)
+    async with asyncio.timeout(timeout):
+        while job['status'] not in (JobStatus.succeeded, JobStatus.failed):
+            await manager.wait_for_change(job_id, since=job['updated_at'], timeout=0.1)
+            job = await manager.get(job_id)
+    return job
+
+
+def test_manager_reclaims_a_crashed_workers_job(store):
+    async def scenario():
+        # Left running by a worker that died without renewing its lease
+        orphan = store.create('https://youtu.be/orphan', 'dead-worker', lease_seconds=-1)
+        assert store.claim(orphan['job_id'], 'dead-worker')
+        # Held by a live worker in another process
+        busy = store.create('https://youtu.be/busy', 'live-worker', lease_seconds=60)
+
+        pipeline = FakePipeline()
+        manager = VideoJobManager(pipeline, store, workers=1, lease_seconds=60)
+        await manager.start()
+        try:
+            job = await wait_until_finished(manager, orphan['job_id'])
+        finally:
+            await manager.stop()
+
+        assert job['status'] == JobStatus.succeeded
+        # The final status is written after every stage update
+        assert job['stage'] == 'done'
+        assert job['result'] == {'url': 'https://youtu.be/orphan'}
+        assert pipeline.urls == ['https://youtu.be/orphan']
+        assert store.get(busy['job_id'])['owner'] == 'live-worker'
+        assert manager._changed == {} and manager._watchers == {}
+
+    asyncio.run(scenario())
+
+
+def test_manager_runs_submitted_jobs(store):
+    async def scenario():
+        manager = VideoJobManager(FakePipeline(), store, workers=2, lease_seconds=60)
+        await manager.start()
+        try:
+            jobs = [await manager.submit(f"https://youtu.be/{i}") for i in range(3)]
+            finished = [await wait_until_finished(manager, job['job_id']) for job in jobs]
+        finally:
+            await manager.stop()
+        assert [job['result'] for job in finished] == [{'url': f"https://youtu.be/{i}"} for i in range(3)]
+
+    asyncio.run(scenario())